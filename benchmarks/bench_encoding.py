@@ -0,0 +1,115 @@
+"""
+Compares the figure encodings of `figure_store.FIGURE_ENCODINGS`: payload size (raw and
+gzipped), time to serialize on the server and, if `node` is on the PATH, time to parse
+and decode in V8 with the same code the browser runs (assets/figure.js).
+
+Usage (from the repository root):
+
+    python benchmarks/bench_encoding.py [--sizes 21x16 84x64 336x256] [--repeats 5]
+"""
+import argparse
+import gzip
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import plotly.graph_objects as go
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC_DIR)
+
+from helpers_wrappers.figure_store import FIGURE_ENCODINGS, serialize_figure  # noqa: E402
+from helpers_wrappers.plotly_helpers import create_surface, make_colorscale_distinct  # noqa: E402
+
+NODE_SCRIPT = """
+const fs = require("fs");
+global.window = {
+    atob: (text) => Buffer.from(text, "base64").toString("binary"),
+    performance: require("perf_hooks").performance,
+    dash_clientside: {no_update: null},
+};
+eval(fs.readFileSync(process.argv[2], "utf8"));
+const text = fs.readFileSync(process.argv[3], "utf8");
+const repeats = Number(process.argv[4]);
+const times = [];
+for (let i = 0; i < repeats; i++) {
+    const start = window.performance.now();
+    window.dash_clientside.figure.decode_typed_arrays(JSON.parse(text));
+    times.push(window.performance.now() - start);
+}
+times.sort((a, b) => a - b);
+console.log(times[Math.floor(times.length / 2)]);
+"""
+
+
+def make_figure(n_rows, n_cols):
+    rng = np.random.default_rng(0)
+    x = np.linspace(0, 14, n_cols)
+    y = np.linspace(0, 1.5, n_rows)
+    base = np.add.outer(y * 4, x)
+    traces = []
+    for shift in (0.0, 0.5):
+        # Source tables have two decimals, derived surfaces (differences, interpolations) don't
+        z = np.round(base + shift + rng.random((n_rows, n_cols)), 2)
+        traces.append(
+            create_surface(
+                x=x,
+                y=y,
+                z=z,
+                colors_scaled=make_colorscale_distinct(8),
+                n_colors=8,
+            )
+        )
+    return go.Figure(data=traces)
+
+
+def node_decode_ms(figure_json, repeats):
+    if shutil.which("node") is None:
+        return None
+    with tempfile.TemporaryDirectory() as directory:
+        script_path = os.path.join(directory, "decode.js")
+        payload_path = os.path.join(directory, "figure.json")
+        with open(script_path, "w") as file:
+            file.write(NODE_SCRIPT)
+        with open(payload_path, "wb") as file:
+            file.write(figure_json)
+        output = subprocess.run(
+            ["node", script_path, os.path.join(SRC_DIR, "assets", "figure.js"), payload_path, str(repeats)],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    return float(output.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", default=["21x16", "84x64", "336x256"])
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'grid':<10} {'encoding':<8} {'bytes':>10} {'gzip':>10} {'serialize':>12} {'parse+decode':>14}")
+    for size in args.sizes:
+        n_rows, n_cols = (int(value) for value in size.split("x"))
+        fig = make_figure(n_rows, n_cols)
+        for encoding in FIGURE_ENCODINGS:
+            times = []
+            for _ in range(args.repeats):
+                start = time.perf_counter()
+                figure_json = serialize_figure(fig, encoding)
+                times.append(time.perf_counter() - start)
+            serialize_ms = sorted(times)[len(times) // 2] * 1000
+            decode_ms = node_decode_ms(figure_json, args.repeats)
+
+            decode = f"{decode_ms:11.2f} ms" if decode_ms is not None else f"{'n/a':>14}"
+            print(
+                f"{size:<10} {encoding:<8} {len(figure_json):>10} {len(gzip.compress(figure_json)):>10} "
+                f"{serialize_ms:9.2f} ms {decode}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Compares the pandas path previously used to read grid files with `grid_reader`.
+
+Usage (from the repository root):
+
+    python benchmarks/bench_grid_reader.py [--files 2000] [--rows 21] [--cols 16]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from helpers_wrappers.grid_reader import read_grid, read_grids  # noqa: E402
+
+
+def write_grids(directory, n_files, n_rows, n_cols):
+    rng = np.random.default_rng(0)
+    paths = []
+    for i in range(n_files):
+        path = os.path.join(directory, f"grid_{i}.txt")
+        np.savetxt(path, rng.random((n_rows, n_cols)) * 14, fmt="%.2f", delimiter="\t")
+        paths.append(path)
+    return paths
+
+
+def timed(label, func, paths):
+    start = time.perf_counter()
+    grids = func(paths)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed * 1000:10.1f} ms  {elapsed / len(paths) * 1e6:8.1f} us/file")
+    return grids
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--rows", type=int, default=21)
+    parser.add_argument("--cols", type=int, default=16)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_grids(directory, args.files, args.rows, args.cols)
+        print(f"{args.files} grids of {args.rows}x{args.cols}")
+
+        expected = timed(
+            "pandas read_csv (serial)",
+            lambda files: [pd.read_csv(path, sep="\t", header=None).to_numpy() for path in files],
+            paths
+        )
+        results = [
+            timed("read_grid (serial)", lambda files: [read_grid(path) for path in files], paths),
+            timed("read_grids (threads)", read_grids, paths),
+            timed("read_grids (processes)", lambda files: read_grids(files, use_processes=True), paths),
+        ]
+
+    for grids in results:
+        assert all(np.array_equal(a, b) for a, b in zip(expected, grids))
+
+
+if __name__ == "__main__":
+    main()
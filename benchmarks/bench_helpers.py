@@ -0,0 +1,250 @@
+"""
+Microbenchmarks for the figure construction hot paths in `helpers_wrappers`.
+
+Every benchmark runs on synthetic surfaces shaped like the real data (21x16 for the
+current speed groups, 20x10 for the wave period groups) plus a larger grid, and is
+parametrised by the number of surfaces where that applies. For each case the median and
+minimum wall time over several repeats and the peak traced memory of a single run are
+recorded.
+
+Usage (from the repository root):
+
+    python benchmarks/bench_helpers.py --save benchmarks/baseline.json
+    python benchmarks/bench_helpers.py --compare benchmarks/baseline.json [--threshold 1.25]
+
+With `--compare`, the script exits with status 1 if any case got slower (median) or
+allocates more (peak memory) than `threshold` times its baseline.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+import numpy as np
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC_DIR)
+# data_store reads its tables relative to `src` when imported
+os.chdir(SRC_DIR)
+
+import plotly  # noqa: E402
+from helpers_wrappers import colorscales, plotly_helpers, surface_plot_creation  # noqa: E402
+
+GRID_SIZES = {
+    "21x16": (21, 16),
+    "20x10": (20, 10),
+    "84x64": (84, 64),
+}
+SURFACE_COUNTS = [2, 8, 32]
+COLOR_COUNTS = [4, 8, 12]
+
+
+def synthetic_surface(nx, ny, seed=0):
+    """
+    Surface with the same kind of values as the data files: growing with x and y, two
+    decimals.
+    """
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, 10, nx)
+    y = np.linspace(0, 1.5, ny)
+    z = 0.07 * x[np.newaxis, :] ** 2 * (1 + y[:, np.newaxis]) + rng.random((ny, nx)) * 0.1
+    return {"x": x, "y": y, "z": np.round(z, 2)}
+
+
+def surface_properties(surface):
+    n_colors = int(np.ceil(surface["z"].max()) // 2) or 1
+    return {
+        "surface": surface,
+        "colorscale": plotly_helpers.make_colorscale_distinct(min(n_colors, 12)),
+        "n_colors": n_colors,
+    }
+
+
+def bench_create_surface(nx, ny, n_surfaces):
+    properties = [surface_properties(synthetic_surface(nx, ny, seed)) for seed in range(n_surfaces)]
+
+    def run():
+        return [
+            plotly_helpers.create_surface(
+                p["surface"]["x"], p["surface"]["y"], p["surface"]["z"], p["colorscale"], p["n_colors"]
+            )
+            for p in properties
+        ]
+    return run
+
+
+def bench_create_layout(nx, ny):
+    surface_1, surface_2 = synthetic_surface(nx, ny, 0), synthetic_surface(nx, ny, 1)
+
+    def run():
+        return plotly_helpers.create_layout(
+            "Wave Height [m]", "Current Speed [m/s]", "SEE Index", "SEE_1", "SEE_2", surface_1, surface_2
+        )
+    return run
+
+
+def bench_create_diff_layout(nx, ny):
+    surfaces = [synthetic_surface(nx, ny, seed) for seed in range(4)]
+
+    def run():
+        return plotly_helpers.create_diff_layout(
+            "Difference", "Wave Height [m]", "Current Speed [m/s]", "Difference [%]",
+            "d0", surfaces[0], "d1", surfaces[1], "d2", surfaces[2], "d3", surfaces[3],
+        )
+    return run
+
+
+def bench_make_colorscale_distinct(n_colors):
+    def run():
+        # Colorscales are cached, so every call would otherwise only measure a cache hit
+        colorscales.get_colorscale.cache_clear()
+        colorscales.palette_colors.cache_clear()
+        return plotly_helpers.make_colorscale_distinct(n_colors)
+    return run
+
+
+def bench_percentage_difference(nx, ny, n_surfaces):
+    base = synthetic_surface(nx, ny, 0)["z"]
+    others = [synthetic_surface(nx, ny, seed)["z"] for seed in range(1, n_surfaces + 1)]
+
+    def run():
+        return [plotly_helpers.percentage_difference(base, other) for other in others]
+    return run
+
+
+def bench_plot_get_figure(nx, ny):
+    surface_plot_creation.SURFACE_PROPERTIES = {
+        "s1": surface_properties(synthetic_surface(nx, ny, 0)),
+        "s2": surface_properties(synthetic_surface(nx, ny, 1)),
+    }
+
+    def run():
+        return surface_plot_creation.Plot("SEE_1", "s1", "SEE_2", "s2", "Plot").get_figure()
+    return run
+
+
+def bench_diff_plot_get_subplot(nx, ny):
+    surface_plot_creation.DIFF_SURFACES = {f"d{i}": synthetic_surface(nx, ny, i) for i in range(4)}
+
+    def run():
+        return surface_plot_creation.DiffPlot("d0", "d0", "d1", "d1", "d2", "d2", "d3", "d3").get_subplot()
+    return run
+
+
+def cases():
+    """
+    Yields (case id, benchmark function) for every parametrisation.
+    """
+    for grid, (nx, ny) in GRID_SIZES.items():
+        for n_surfaces in SURFACE_COUNTS:
+            yield f"create_surface[{grid},n={n_surfaces}]", bench_create_surface(nx, ny, n_surfaces)
+            yield f"percentage_difference[{grid},n={n_surfaces}]", bench_percentage_difference(nx, ny, n_surfaces)
+        yield f"create_layout[{grid}]", bench_create_layout(nx, ny)
+        yield f"Plot.get_figure[{grid}]", bench_plot_get_figure(nx, ny)
+        # The diff layout places its labels at fixed grid cells (x[20], y[13])
+        if nx > 20 and ny > 13:
+            yield f"create_diff_layout[{grid}]", bench_create_diff_layout(nx, ny)
+            yield f"DiffPlot.get_subplot[{grid}]", bench_diff_plot_get_subplot(nx, ny)
+    for n_colors in COLOR_COUNTS:
+        yield f"make_colorscale_distinct[n={n_colors}]", bench_make_colorscale_distinct(n_colors)
+
+
+def measure(run, repeats, min_time):
+    # Calibrate the number of calls per repeat so that each repeat takes at least `min_time`
+    run()
+    calls = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(calls):
+            run()
+        if time.perf_counter() - start >= min_time:
+            break
+        calls *= 2
+
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(calls):
+            run()
+        timings.append((time.perf_counter() - start) / calls)
+
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "median_s": statistics.median(timings),
+        "min_s": min(timings),
+        "peak_bytes": peak,
+        "calls_per_repeat": calls,
+    }
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    print(f"{'case':<44} {'median':>12} {'baseline':>12} {'ratio':>7} {'peak ratio':>10}")
+    for case_id, result in results.items():
+        base = baseline.get(case_id)
+        if base is None:
+            print(f"{case_id:<44} {result['median_s'] * 1e6:10.1f}us {'(new)':>12}")
+            continue
+        time_ratio = result["median_s"] / base["median_s"]
+        memory_ratio = result["peak_bytes"] / base["peak_bytes"] if base["peak_bytes"] else 1.0
+        flag = " REGRESSION" if time_ratio > threshold or memory_ratio > threshold else ""
+        print(
+            f"{case_id:<44} {result['median_s'] * 1e6:10.1f}us {base['median_s'] * 1e6:10.1f}us "
+            f"{time_ratio:7.2f} {memory_ratio:10.2f}{flag}"
+        )
+        if flag:
+            regressions.append(case_id)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--save", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Compare against a JSON file written with --save")
+    parser.add_argument("--threshold", type=float, default=1.25, help="Allowed ratio against the baseline")
+    parser.add_argument("--repeats", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.05, help="Minimum seconds per repeat")
+    parser.add_argument("--filter", default="", help="Only run cases whose id contains this string")
+    args = parser.parse_args()
+
+    results = {}
+    for case_id, run in cases():
+        if args.filter in case_id:
+            results[case_id] = measure(run, args.repeats, args.min_time)
+            if not args.compare:
+                print(f"{case_id:<44} {results[case_id]['median_s'] * 1e6:10.1f}us "
+                      f"{results[case_id]['peak_bytes'] / 1024:10.1f} KiB")
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(
+                {
+                    "meta": {
+                        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                        "python": platform.python_version(),
+                        "numpy": np.__version__,
+                        "plotly": plotly.__version__,
+                        "machine": platform.machine(),
+                    },
+                    "results": results,
+                },
+                file,
+                indent=2
+            )
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)["results"]
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
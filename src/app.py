@@ -1,15 +1,38 @@
-from dash import dash, \
-    dcc, \
-    html, \
-    Output, \
-    Input
-import dash_bootstrap_components as dbc
-import plotly.graph_objects as go
+from helpers_wrappers.startup_report import STARTUP_REPORT
 
-from helpers_wrappers.surface_plot_creation import get_cam_data
-from helpers_wrappers.plotly_helpers import create_surface, create_layout
+with STARTUP_REPORT.phase("imports"):
+    from dash import dash, \
+        dcc, \
+        html, \
+        ctx, \
+        Output, \
+        Input, \
+        State, \
+        Patch, \
+        no_update, \
+        ClientsideFunction
+    import dash_bootstrap_components as dbc
+    import plotly.graph_objects as go
 
-import pickle
+    from helpers_wrappers.surface_plot_creation import CAM_DATA_HINT, \
+        create_cam_table
+    from helpers_wrappers.plotly_helpers import create_surface, create_layout
+    from helpers_wrappers.figure_store import FigureCache, apply_overlay, load_json, pack_arrays, \
+        serialize_figure
+    from helpers_wrappers.figure_endpoint import register_figure_route
+    from helpers_wrappers.dataset_registry import DatasetRegistry
+    from helpers_wrappers.metrics import instrument_callbacks
+    from helpers_wrappers.lod import LOD_BUDGETS, SurfaceLODCache, choose_tier
+    from helpers_wrappers.image_export import ImageExporter, register_export_routes
+    from helpers_wrappers.point_query import register_query_route
+    from helpers_wrappers.combination_index import register_combination_route
+    from plotly.io.json import to_json_plotly
+    from helpers_wrappers.warm_start import FigureWarmer, load_popularity, save_popularity, \
+        register_health_routes
+
+    import atexit
+
+    import os
 
 
 dbc_css = "https://cdn.jsdelivr.net/gh/AnnMarieW/dash-bootstrap-templates@V1.0.2/dbc.min.css"
@@ -20,91 +43,267 @@ app = dash.Dash(
     prevent_initial_callbacks="initial_duplicate"
 )
 server = app.server
+callback_metrics = instrument_callbacks(app)
+
+# Load data, see helpers_wrappers/artifact.py for the format
+ARTIFACT_PATH = os.environ.get("SURFACE_ARTIFACT", "../out/artifact")
+# Seconds between checks for a rebuilt artifact (see `build --watch`), 0 disables reloading
+RELOAD_INTERVAL = float(os.environ.get("SURFACE_RELOAD_INTERVAL", 0))
+with STARTUP_REPORT.phase("ingestion"):
+    datasets = DatasetRegistry(ARTIFACT_PATH, RELOAD_INTERVAL)
+
+# The dropdown only ever receives a capped number of options, found by searching on the server
+MAX_DROPDOWN_OPTIONS = 50
+default_graph = list(datasets.current.surface_data.keys())[0]
+dropdown_options = [
+    {'label': key, 'value': key}
+    for key in datasets.current.search_index.search("", MAX_DROPDOWN_OPTIONS)
+]
+
+
+# Resolution tiers of the recently drawn surfaces, by surface name and revision, each tier
+# computed the first time a surface is drawn at it
+LOD_CACHE_BYTES = int(os.environ.get("LOD_CACHE_BYTES", 64 * 1024 * 1024))
+surface_lods = SurfaceLODCache(LOD_CACHE_BYTES)
+
+
+def surface_tier(
+        dataset,
+        plot_title,
+        name,
+        tier
+):
+    return surface_lods.tier(
+        (name, dataset.revision(name)),
+        lambda: dataset.surface_data[plot_title][name]["surface"],
+        tier
+    )
+
+
+def pairing_revisions(
+        dataset,
+        plot_title
+):
+    return tuple(dataset.revision(name) for name in plot_title.split("+"))
 
-# Load data
-with open("E:/projects/python-dash-app/out/binaries/DATA_BATCH_1.pickle", "rb") as file:
-    surface_data = pickle.load(file)
 
-dropdown_options = [{'label': f""}]
+def tier_figure_key(
+        plot_title,
+        tier
+):
+    """
+    Returns the figure cache key of a pairing at a detail tier. The key includes the
+    revisions of both surfaces, so a reload only makes the figures of changed surfaces
+    miss the cache.
+    """
+    return plot_title, tier, pairing_revisions(datasets.current, plot_title)
+
 
-# dropdown_options = [{'label': key, 'value': key} for key in surface_data.keys()]
+def figure_key(
+        plot_title,
+        vertex_hint
+):
+    """
+    Returns the figure cache key of a pairing for the number of vertices the client wants
+    to render at most, see `lod.choose_tier`.
+    """
+    return tier_figure_key(plot_title, choose_tier(vertex_hint, n_surfaces=2))
 
-surfaces = []
 
-for i in range(len(surface_data)):
-    plot_title = list(surface_data.keys())[i]
+def build_figure(
+        key
+):
+    """
+    Builds the figure of a single pairing at one detail tier, called by the figure cache
+    the first time the pairing is selected at that tier.
+    """
+    plot_title, tier, _ = key
     name_1, name_2 = plot_title.split("+")
+    dataset = datasets.current
+    surface_data = dataset.surface_data
 
-    # Transpose tables to match the orientation of the other tables
-    surface_data[plot_title][name_1]["surface"]["z"] = surface_data[plot_title][name_1]["surface"]["z"] if "WPI" not in name_1 else surface_data[plot_title][name_1]["surface"]["z"].T
+    with STARTUP_REPORT.phase("trace build"):
+        name_1_max = dataset.store.max_value(name_1)
+        name_2_max = dataset.store.max_value(name_2)
 
-    surface_data[plot_title][name_2]["surface"]["z"] = surface_data[plot_title][name_2]["surface"]["z"] if "WPI" not in name_2 else surface_data[plot_title][name_2]["surface"]["z"].T
+        colorscale_1 = surface_data[plot_title][name_1]["colorscale"]
+        colorscale_2 = surface_data[plot_title][name_2]["colorscale"]
 
-    name_1_max = surface_data[plot_title][name_1]["surface"]["z"].max().max()
-    name_2_max = surface_data[plot_title][name_2]["surface"]["z"].max().max()
+        with STARTUP_REPORT.phase("resampling"):
+            tier_1 = surface_tier(dataset, plot_title, name_1, tier)
+            tier_2 = surface_tier(dataset, plot_title, name_2, tier)
 
-    colorscale_1 = [
-        [scale_value, color]
-        for scale_values in surface_data[plot_title][name_1]["colorscale"]
-        for scale_value, color in scale_values
-    ]
+        surface_1 = create_surface(
+            x=tier_1.x,
+            y=tier_1.y,
+            z=tier_1.z,
+            colors_scaled=colorscale_1,
+            n_colors=surface_data[plot_title][name_1]["n_colors"],
+            opacity=1.0 if name_2_max > name_1_max else 0.8,
+            show_colorbar=False if name_2_max > name_1_max else True,
+            ambient_light=0.9 if name_2_max > name_1_max else 0.5,
+        )
+        surface_2 = create_surface(
+            x=tier_2.x,
+            y=tier_2.y,
+            z=tier_2.z,
+            colors_scaled=colorscale_2,
+            n_colors=surface_data[plot_title][name_2]["n_colors"],
+            opacity=0.8 if name_2_max > name_1_max else 1.0,
+            show_colorbar=True if name_2_max > name_1_max else False,
+            ambient_light=0.5 if name_2_max > name_1_max else 0.9,
+        )
+
+    with STARTUP_REPORT.phase("layout build"):
+        layout = create_layout(
+            x_label="Wave Height [m]",
+            y_label="Wave Period [s]" if "WPI" in plot_title else "Current Speed [m/s]",
+            z_label="SEE Index" if "SEE" in plot_title else "EVRD Index",
+            surface_1_name=name_1,
+            surface_2_name=name_2,
+            surface_1=tier_1.surface,
+            surface_2=tier_2.surface,
+            x_scale=1.0,
+            y_scale=0.5,
+            z_scale=0.5
+        )
+
+    with STARTUP_REPORT.phase("figure assembly"):
+        return go.Figure(data=[surface_1, surface_2], layout=layout)
+
+
+# Figures are built on first selection, serialized once and shared read-only by all sessions
+FIGURE_CACHE_BYTES = int(os.environ.get("FIGURE_CACHE_BYTES", 64 * 1024 * 1024))
+# One of "json", "round" or "typed", see FIGURE_ENCODINGS in helpers_wrappers/figure_store.py
+FIGURE_ENCODING = os.environ.get("FIGURE_ENCODING", "round")
+figures = FigureCache(
+    build_figure,
+    max_bytes=FIGURE_CACHE_BYTES,
+    encoding=FIGURE_ENCODING,
+    precompress=True
+)
+
+# "1" builds the figures in a background thread once the server is up, see
+# helpers_wrappers/warm_start.py, otherwise only the first figure is built before serving
+# (under gunicorn, also the figures in `FIGURE_POPULARITY`, see `prewarm_figures`)
+WARM_START = os.environ.get("FIGURE_WARM_START") == "1"
+# "all" makes `prewarm_figures` build the whole catalogue (until the figure cache is full)
+# instead of only the first page's figure and the popular ones
+FIGURE_PREWARM = os.environ.get("FIGURE_PREWARM", "popular")
+# JSON file of request counts per plot title and tier that orders the build, updated on exit
+FIGURE_POPULARITY = os.environ.get("FIGURE_POPULARITY")
+warmer = FigureWarmer(
+    lambda plot_title, tier: figures.get_entry(tier_figure_key(plot_title, tier)),
+    lambda: datasets.current.surface_data,
+    popularity=load_popularity(FIGURE_POPULARITY),
+    required=[default_graph],
+    is_full=lambda: figures.evictions > 0
+)
+register_health_routes(server, warmer)
+# Interpolated surface values at arbitrary points on /query, see helpers_wrappers/point_query.py
+register_query_route(server, lambda: datasets.current.points)
+# Overlays of any number of surfaces of a group on /combinations, see
+# helpers_wrappers/combination_index.py
+register_combination_route(server, lambda group: datasets.current.store.groups[group].names)
+if FIGURE_POPULARITY:
+    atexit.register(lambda: save_popularity(FIGURE_POPULARITY, warmer.requests))
 
-    colorscale_2 = [
-        [scale_value, color]
-        for scale_values in surface_data[plot_title][name_2]["colorscale"]
-        for scale_value, color in scale_values
-    ]
 
-    surface_1 = create_surface(
-        x=surface_data[plot_title][name_1]["surface"]["x"],
-        y=surface_data[plot_title][name_1]["surface"]["y"],
-        z=surface_data[plot_title][name_1]["surface"]["z"],
-        colors_scaled=colorscale_1,
-        n_colors=surface_data[plot_title][name_1]["n_colors"],
-        opacity=1.0 if name_2_max > name_1_max else 0.8,
-        show_colorbar=False if name_2_max > name_1_max else True,
-        ambient_light=0.9 if name_2_max > name_1_max else 0.5,
+def requested_figure_key(
+        plot_title,
+        vertex_hint
+):
+    key = figure_key(plot_title, vertex_hint)
+    warmer.request(plot_title, key[1])
+    return key
+
+
+# Compressed, conditionally cacheable copies of the same figures on /figures/<plot title>
+register_figure_route(
+    server,
+    figures,
+    datasets,
+    requested_figure_key
+)
+
+
+def refresh_figures(
+        old,
+        new,
+        changed
+):
+    """
+    Drops the resolution tiers and figures of the surfaces that changed in a reload and
+    rebuilds the figures that were cached, so the next visitor doesn't wait for them.
+    Figures of unchanged surfaces stay cached.
+    """
+    surface_lods.discard(
+        lambda key: key[0] in changed and (key[0] not in new.store or key[1] != new.revision(key[0]))
     )
-    surface_2 = create_surface(
-        x=surface_data[plot_title][name_2]["surface"]["x"],
-        y=surface_data[plot_title][name_2]["surface"]["y"],
-        z=surface_data[plot_title][name_2]["surface"]["z"],
-        colors_scaled=colorscale_2,
-        n_colors=surface_data[plot_title][name_2]["n_colors"],
-        opacity=0.8 if name_2_max > name_1_max else 1.0,
-        show_colorbar=True if name_2_max > name_1_max else False,
-        ambient_light=0.5 if name_2_max > name_1_max else 0.9,
+
+    stale = figures.discard(
+        lambda key: key[0] not in new.surface_data or key[2] != pairing_revisions(new, key[0])
     )
-    surfaces.append([surface_1, surface_2])
+    for plot_title, tier, _ in stale:
+        if plot_title in new.surface_data:
+            figures.get_entry((plot_title, tier, pairing_revisions(new, plot_title)))
 
 
-# Create layout
-layouts = []
+datasets.add_listener(refresh_figures)
+datasets.start()
 
-for i in range(len(surface_data)):
-    plot_title = list(surface_data.keys())[i]
-    name_1, name_2 = plot_title.split("+")
-    layout = create_layout(
-        x_label="Wave Height [m]",
-        y_label="Wave Period [s]" if "WPI" in plot_title else "Current Speed [m/s]",
-        z_label="SEE Index" if "SEE" in plot_title else "EVRD Index",
-        surface_1_name=name_1,
-        surface_2_name=name_2,
-        surface_1=surface_data[plot_title][name_1]["surface"],
-        surface_2=surface_data[plot_title][name_2]["surface"],
-        x_scale=1.0,
-        y_scale=0.5,
-        z_scale=0.5
-    )
-    layouts.append(layout)
 
-# Assemble figures
-figures = {
-    title: go.Figure(data=surfaces[i], layout=layouts[i])
-    for title, i in zip(surface_data.keys(), range(len(surface_data)))
+def prewarm_figures():
+    """
+    Builds the first page's figure and the figures requested in earlier runs, most
+    requested first, or with `FIGURE_PREWARM=all` the whole catalogue, until the figure
+    cache is full. Called by gunicorn before it forks the workers (see gunicorn.conf.py),
+    so the workers share these figures instead of each building its own. Other figures
+    are built on first request.
+    """
+    warmer.run(popular_only=FIGURE_PREWARM != "all")
+
+
+# Maps each annotation input to the index of the scene annotation it edits and the
+# property path inside that annotation
+ANNOTATION_FIELDS = {
+    f"annotation-{axis}-{field}": (index, path)
+    for index, axis in enumerate(["x", "y", "z"])
+    for field, path in [
+        ("x", ["x"]),
+        ("y", ["y"]),
+        ("z", ["z"]),
+        ("font-size", ["font", "size"]),
+        ("xshift", ["xshift"]),
+        ("yshift", ["yshift"]),
+        ("textangle", ["textangle"]),
+    ]
 }
 
 
+def build_annotations(
+        annotation_values
+):
+    """
+    Builds the scene annotations list from the values of the annotation inputs, in the
+    order of `ANNOTATION_FIELDS`. The two trailing empty dicts leave the surface name
+    annotations untouched when merged into the figure with `apply_overlay`.
+    """
+    annotations = [
+        dict(font=dict(color="black")),
+        dict(font=dict(color="black")),
+        dict(font=dict(color="black")),
+        dict(),
+        dict(),
+    ]
+    for (index, path), value in zip(ANNOTATION_FIELDS.values(), annotation_values):
+        target = annotations[index]
+        for key in path[:-1]:
+            target = target.setdefault(key, {})
+        target[path[-1]] = value
+
+    return annotations
+
 
 app.layout = dbc.Container(
     [
@@ -117,6 +316,15 @@ app.layout = dbc.Container(
                 dbc.Col(
                     [
                         html.Div(
+                            [
+                                html.Div(
+                                    CAM_DATA_HINT,
+                                    id="cam-output-hint"
+                                ),
+                                create_cam_table(
+                                    "main"
+                                ),
+                            ],
                             id="cam-output"
                         ),
                     ],
@@ -142,6 +350,18 @@ app.layout = dbc.Container(
                                 }
                             },
                         ),
+                        # Encoded figure, only used with the "typed" figure encoding
+                        dcc.Store(
+                            id="figure-payload"
+                        ),
+                        # Number of vertices the browser should render at most (assets/lod.js)
+                        dcc.Store(
+                            id="lod-hint"
+                        ),
+                        # Latest scene camera, updated at most once per frame (assets/camera.js)
+                        dcc.Store(
+                            id="scene-camera"
+                        ),
                         html.Div(
                             [
                                 html.Label(
@@ -150,7 +370,8 @@ app.layout = dbc.Container(
                                 dcc.Dropdown(
                                     id="graph-selector",
                                     options=dropdown_options,
-                                    value=list(surface_data.keys())[0],
+                                    value=default_graph,
+                                    placeholder="Search, e.g. 50m group:A02 index:see y:period",
                                     clearable=False,
                                     style={
                                         "width": "50%"}
@@ -668,247 +889,241 @@ app.layout = dbc.Container(
 )
 
 
-@app.callback(
+def annotation_defaults():
+    """
+    Returns the initial value of every annotation input of the layout.
+    """
+    return {
+        component.id: component.value
+        for component in app.layout._traverse()
+        if getattr(component, "id", None) in ANNOTATION_FIELDS
+    }
+
+
+def export_figure(
+        plot_title,
+        annotations
+):
+    """
+    Returns the serialized figure of a pairing at the highest detail tier, with the
+    annotation overlay of the given annotation input values (input id to value, defaults
+    to the initial values of the layout). Figures that aren't cached are built without
+    being cached, so exports don't push the figures of the app out of the cache.
+
+    Either way the figure is the one of the "round" encoding, decoded like the cached
+    figures: cached or not, the same figure gives the same JSON (and so hits the image
+    cache, see `image_export.export_key`), and typed arrays, which the plotly.js of
+    kaleido can't read, are never exported.
+    """
+    values = {**annotation_defaults(), **annotations}
+    key = figure_key(plot_title, 2 * LOD_BUDGETS[-1])
+    if FIGURE_ENCODING == "round" and key in figures:
+        base_figure = figures.get(key)
+    else:
+        base_figure = pack_arrays(load_json(serialize_figure(build_figure(key), "round")))
+    figure = apply_overlay(
+        base_figure,
+        build_annotations([values[component_id] for component_id in ANNOTATION_FIELDS]),
+        uirevision=plot_title
+    )
+    return to_json_plotly(figure).encode("utf-8")
+
+
+# Server-side image export jobs on /exports, see helpers_wrappers/image_export.py
+IMAGE_EXPORT_DIR = os.environ.get("IMAGE_EXPORT_DIR", "../out/images")
+IMAGE_EXPORT_WORKERS = int(os.environ.get("IMAGE_EXPORT_WORKERS", os.cpu_count() or 1))
+exporter = ImageExporter(IMAGE_EXPORT_DIR, IMAGE_EXPORT_WORKERS)
+register_export_routes(
+    server,
+    exporter,
+    lambda: datasets.current.surface_data,
+    export_figure
+)
+
+
+# Camera readout runs in the browser (assets/camera.js), rotating the scene causes no requests
+app.clientside_callback(
+    ClientsideFunction(
+        namespace="camera",
+        function_name="stash_camera"
+    ),
     Output(
-        "cam-output",
-        "children"
+        "scene-camera",
+        "data"
     ),
     Input(
         "plot-window",
         "relayoutData"
     ),
 )
-def update_camera_output(
-        relayout_data
-):
-    return get_cam_data(
-        relayout_data,
-        "main"
-    )
+app.clientside_callback(
+    ClientsideFunction(
+        namespace="camera",
+        function_name="update_camera_output"
+    ),
+    Output(
+        "main-cam-properties",
+        "data"
+    ),
+    Output(
+        "cam-output-hint",
+        "children"
+    ),
+    Input(
+        "scene-camera",
+        "data"
+    ),
+)
 
 
 @app.callback(
     Output(
+        "graph-selector",
+        "options"
+    ),
+    Input(
+        "graph-selector",
+        "search_value"
+    ),
+    State(
+        "graph-selector",
+        "value"
+    ),
+)
+def search_graphs(
+        search_value,
+        value
+):
+    if not search_value:
+        return no_update
+
+    matches = datasets.current.search_index.search(search_value, MAX_DROPDOWN_OPTIONS)
+    # Keep the selected graph in the options, otherwise the dropdown would clear it
+    if value and value not in matches:
+        matches = [value] + matches
+
+    # The dropdown filters options against the search text in the browser as well, which
+    # would hide matches found by facet terms, so every option is searchable by the query
+    return [{'label': key, 'value': key, 'search': search_value} for key in matches]
+
+
+# The level of detail hint is measured in the browser once the page has loaded, the
+# graph's id only serves as a trigger
+app.clientside_callback(
+    ClientsideFunction(
+        namespace="lod",
+        function_name="vertex_hint"
+    ),
+    Output(
+        "lod-hint",
+        "data"
+    ),
+    Input(
         "plot-window",
-        "figure"
+        "id"
     ),
-    [
-        Input(
-            "graph-selector",
-            "value"
-        ),
-        Input(
-            "annotation-x-x",
-            "value"
-        ),
-        Input(
-            "annotation-x-y",
-            "value"
-        ),
-        Input(
-            "annotation-x-z",
-            "value"
-        ),
-        Input(
-            "annotation-x-font-size",
-            "value"
-        ),
-        # Input(
-        #     "annotation-x-xanchor",
-        #     "value"
-        # ),
-        # Input(
-        #     "annotation-x-yanchor",
-        #     "value"
-        # ),
-        Input(
-            "annotation-x-xshift",
-            "value"
-        ),
-        Input(
-            "annotation-x-yshift",
-            "value"
-        ),
-        Input(
-            "annotation-x-textangle",
-            "value"
-        ),
-        Input(
-            "annotation-y-x",
-            "value"
-        ),
-        Input(
-            "annotation-y-y",
-            "value"
-        ),
-        Input(
-            "annotation-y-z",
-            "value"
-        ),
-        Input(
-            "annotation-y-font-size",
-            "value"
-        ),
-        # Input(
-        #     "annotation-y-xanchor",
-        #     "value"
-        # ),
-        # Input(
-        #     "annotation-y-yanchor",
-        #     "value"
-        # ),
-        Input(
-            "annotation-y-xshift",
-            "value"
-        ),
-        Input(
-            "annotation-y-yshift",
-            "value"
-        ),
-        Input(
-            "annotation-y-textangle",
-            "value"
-        ),
-        Input(
-            "annotation-z-x",
-            "value"
-        ),
-        Input(
-            "annotation-z-y",
-            "value"
-        ),
-        Input(
-            "annotation-z-z",
-            "value"
-        ),
-        Input(
-            "annotation-z-font-size",
-            "value"
+)
+
+
+# Typed arrays are sent to a store and decoded into the figure in the browser (assets/figure.js)
+if FIGURE_ENCODING == "typed":
+    app.clientside_callback(
+        ClientsideFunction(
+            namespace="figure",
+            function_name="decode_typed_arrays"
         ),
-        # Input(
-        #     "annotation-z-xanchor",
-        #     "value"
-        # ),
-        # Input(
-        #     "annotation-z-yanchor",
-        #     "value"
-        # ),
-        Input(
-            "annotation-z-xshift",
-            "value"
+        Output(
+            "plot-window",
+            "figure"
         ),
         Input(
-            "annotation-z-yshift",
-            "value"
+            "figure-payload",
+            "data"
         ),
-        Input(
-            "annotation-z-textangle",
+    )
+    figure_output = Output(
+        "figure-payload",
+        "data"
+    )
+else:
+    figure_output = Output(
+        "plot-window",
+        "figure"
+    )
+
+
+@app.callback(
+    figure_output,
+    Input(
+        "graph-selector",
+        "value"
+    ),
+    Input(
+        "lod-hint",
+        "data"
+    ),
+    [
+        State(
+            component_id,
             "value"
-        ),
+        )
+        for component_id in ANNOTATION_FIELDS
     ],
 )
-def update_annotation_pos(
-        graph_selector,
-        annotation_x_x,
-        annotation_x_y,
-        annotation_x_z,
-        annotation_x_font_size,
-        # annotation_x_xanchor,
-        # annotation_x_yanchor,
-        annotation_x_xshift,
-        annotation_x_yshift,
-        annotation_x_textangle,
-        annotation_y_x,
-        annotation_y_y,
-        annotation_y_z,
-        annotation_y_font_size,
-        # annotation_y_xanchor,
-        # annotation_y_yanchor,
-        annotation_y_xshift,
-        annotation_y_yshift,
-        annotation_y_textangle,
-        annotation_z_x,
-        annotation_z_y,
-        annotation_z_z,
-        annotation_z_font_size,
-        # annotation_z_xanchor,
-        # annotation_z_yanchor,
-        annotation_z_xshift,
-        annotation_z_yshift,
-        annotation_z_textangle,
+def select_graph(
+        graph,
+        vertex_hint,
+        *annotation_values
 ):
-    annotations = [
-        dict(
-            x=annotation_x_x,
-            y=annotation_x_y,
-            z=annotation_x_z,
-            font=dict(size=annotation_x_font_size, color="black"),
-            xshift=annotation_x_xshift,
-            yshift=annotation_x_yshift,
-            textangle=annotation_x_textangle,
-            # xanchor=annotation_x_xanchor,
-            # yanchor=annotation_x_yanchor,
-        ),
-        dict(
-            x=annotation_y_x,
-            y=annotation_y_y,
-            z=annotation_y_z,
-            font=dict(size=annotation_y_font_size, color="black"),
-            xshift=annotation_y_xshift,
-            yshift=annotation_y_yshift,
-            textangle=annotation_y_textangle,
-            # xanchor=annotation_y_xanchor,
-            # yanchor=annotation_y_yanchor,
-        ),
-        dict(
-            x=annotation_z_x,
-            y=annotation_z_y,
-            z=annotation_z_z,
-            font=dict(size=annotation_z_font_size, color="black"),
-            xshift=annotation_z_xshift,
-            yshift=annotation_z_yshift,
-            textangle=annotation_z_textangle,
-            # xanchor=annotation_z_xanchor,
-            # yanchor=annotation_z_yanchor,
-        ),
-        dict(),
-        dict(),
-    ]
-
-    fig = figures[graph_selector]
-    fig.update_layout(
-        autosize=False,
-        height=900,
-        scene=dict(
-            annotations=annotations
-        ),
-        uirevision=graph_selector,
-        overwrite=False,
+    # The selected pairing may have been removed by a reload since the page was loaded
+    if graph not in datasets:
+        return no_update
 
+    return apply_overlay(
+        figures.get(requested_figure_key(graph, vertex_hint)),
+        build_annotations(annotation_values),
+        uirevision=graph
     )
 
-    return fig
-
 
 @app.callback(
     Output(
-        'plot-window',
-        'figure',
+        "plot-window",
+        "figure",
         allow_duplicate=True
     ),
-    Input(
-        "graph-selector",
-        "value"
-    ),
+    [
+        Input(
+            component_id,
+            "value"
+        )
+        for component_id in ANNOTATION_FIELDS
+    ],
 )
-def select_graph(
-        graph
+def update_annotation_pos(
+        *annotation_values
 ):
-    fig = figures[graph]
-    fig.update_layout(
-        uirevision=graph,
-    )
-    return fig
+    """
+    Sends only the annotation properties whose inputs triggered the callback as a partial
+    figure update, instead of re-sending the full figure on every keystroke.
+    """
+    patched_figure = Patch()
+    for prop_id, component_id in ctx.triggered_prop_ids.items():
+        index, path = ANNOTATION_FIELDS[component_id]
+        target = patched_figure["layout"]["scene"]["annotations"][index]
+        for key in path[:-1]:
+            target = target[key]
+        target[path[-1]] = ctx.inputs[prop_id]
+
+    return patched_figure
+
+
+if WARM_START:
+    warmer.start()
+else:
+    # The first figure is what the first visitor waits for
+    warmer.warm(default_graph)
+STARTUP_REPORT.emit()
 
 
 if __name__ == '__main__':
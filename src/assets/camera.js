@@ -0,0 +1,73 @@
+// Clientside readout of the scene camera for the `cam-output` table, so rotating or
+// zooming the 3D scene never hits the server.
+//
+// Plotly emits `plotly_relayout` for every wheel step, which can be many times per
+// frame on trackpads. `stash_camera` keeps the latest camera and writes it into the
+// `scene-camera` store at most once per animation frame. Every call returns its own
+// promise. When a newer event arrives in the same frame, the previous promise resolves
+// with `no_update` right away. Only the promise of the frame's last event resolves on
+// the frame, with the camera at that time. That way only one write happens per frame,
+// and it is the latest camera even though dash keeps only the result of the latest
+// call. The table is then filled from the store by `update_camera_output`.
+(function () {
+    const AXES = ["x", "y", "z"];
+
+    let latestCamera = null;
+    // Resolves the promise returned by the last call, pending until the next frame
+    let resolvePending = null;
+    let framePending = false;
+
+    function cameraRows(camera) {
+        return AXES.map(function (axis) {
+            return {
+                Axis: axis,
+                Eye: camera.eye && axis in camera.eye ? camera.eye[axis] : null,
+                Center: camera.center && axis in camera.center ? camera.center[axis] : null,
+            };
+        });
+    }
+
+    function flush() {
+        framePending = false;
+        const resolve = resolvePending;
+        resolvePending = null;
+        if (resolve !== null) {
+            resolve(latestCamera);
+        }
+    }
+
+    function flushOnNextFrame() {
+        if (resolvePending !== null) {
+            // Superseded by this call, its camera is flushed with this one
+            resolvePending(window.dash_clientside.no_update);
+        }
+        if (!framePending) {
+            framePending = true;
+            window.requestAnimationFrame(flush);
+        }
+        return new Promise(function (resolve) {
+            resolvePending = resolve;
+        });
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        camera: {
+            stash_camera: function (relayoutData) {
+                if (!relayoutData || !("scene.camera" in relayoutData)) {
+                    return window.dash_clientside.no_update;
+                }
+                latestCamera = relayoutData["scene.camera"];
+                return flushOnNextFrame();
+            },
+
+            update_camera_output: function (camera) {
+                const noUpdate = window.dash_clientside.no_update;
+
+                if (!camera) {
+                    return [noUpdate, noUpdate];
+                }
+                return [cameraRows(camera), null];
+            },
+        },
+    });
+})();
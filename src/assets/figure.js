@@ -0,0 +1,57 @@
+// Decodes figures sent with the `typed` figure encoding (see FIGURE_ENCODINGS in
+// helpers_wrappers/figure_store.py). Trace coordinates arrive as
+// {dtype: "f4", shape: [...], bdata: "<base64>"} and are turned into Float32Arrays,
+// 2D arrays into an array of row views on a single buffer. The time spent decoding is
+// kept in `window.dash_clientside.figure.lastDecodeMs` for comparing encodings.
+(function () {
+    const ARRAY_KEYS = ["x", "y", "z"];
+
+    function decodeArray(value) {
+        if (!value || typeof value !== "object" || typeof value.bdata !== "string") {
+            return value;
+        }
+
+        const binary = window.atob(value.bdata);
+        const bytes = new Uint8Array(binary.length);
+        for (let i = 0; i < binary.length; i++) {
+            bytes[i] = binary.charCodeAt(i);
+        }
+        const values = new Float32Array(bytes.buffer);
+
+        if (value.shape.length < 2) {
+            return values;
+        }
+        const columns = value.shape[1];
+        const rows = [];
+        for (let row = 0; row < value.shape[0]; row++) {
+            rows.push(values.subarray(row * columns, (row + 1) * columns));
+        }
+        return rows;
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        figure: {
+            lastDecodeMs: null,
+
+            decode_typed_arrays: function (figure) {
+                if (!figure) {
+                    return window.dash_clientside.no_update;
+                }
+
+                const start = window.performance.now();
+                const data = figure.data.map(function (trace) {
+                    const decoded = Object.assign({}, trace);
+                    ARRAY_KEYS.forEach(function (key) {
+                        if (key in trace) {
+                            decoded[key] = decodeArray(trace[key]);
+                        }
+                    });
+                    return decoded;
+                });
+                window.dash_clientside.figure.lastDecodeMs = window.performance.now() - start;
+
+                return Object.assign({}, figure, {data: data});
+            },
+        },
+    });
+})();
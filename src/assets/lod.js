@@ -0,0 +1,21 @@
+// Client hint for the level of detail of the surfaces (see helpers_wrappers/lod.py): the
+// number of vertices this browser should render at most. It scales with the number of
+// device pixels of the window and is halved on devices that report little memory.
+(function () {
+    const VERTICES_PER_PIXEL = 1 / 40;
+    const MIN_VERTICES = 5000;
+    const MAX_VERTICES = 320000;
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        lod: {
+            vertex_hint: function () {
+                const ratio = window.devicePixelRatio || 1;
+                let vertices = window.innerWidth * window.innerHeight * ratio * ratio * VERTICES_PER_PIXEL;
+                if (navigator.deviceMemory && navigator.deviceMemory < 4) {
+                    vertices /= 2;
+                }
+                return Math.round(Math.min(Math.max(vertices, MIN_VERTICES), MAX_VERTICES));
+            },
+        },
+    });
+})();
@@ -0,0 +1,68 @@
+"""
+Exports figures of the app to static images, see helpers_wrappers/image_export.py.
+
+Run from `src`, with the same environment as the app (`SURFACE_ARTIFACT`, ...):
+
+    python export_images.py --out ../out/report [--titles TITLE ...] [--format png]
+        [--width 1200] [--height 900] [--scale 2] [--annotations values.json] [--workers 8]
+
+`--annotations` is a JSON file of annotation input ids to values, e.g.
+`{"annotation-x-font-size": 20}`, applied on top of the app's initial values.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", required=True, help="Directory the images are copied to")
+    parser.add_argument("--titles", nargs="+", default=None, help="Plot titles, defaults to every figure")
+    parser.add_argument("--format", default="png", help="png, svg or pdf")
+    parser.add_argument("--width", type=int, default=None)
+    parser.add_argument("--height", type=int, default=None)
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--annotations", default=None, help="JSON file of annotation input values")
+    parser.add_argument("--workers", type=int, default=None, help="Render processes, defaults to the app's")
+    args = parser.parse_args(argv)
+
+    import app
+
+    annotations = {}
+    if args.annotations is not None:
+        with open(args.annotations) as file:
+            annotations = json.load(file)
+    if args.workers is not None:
+        app.exporter.max_workers = args.workers
+
+    titles = args.titles or list(app.datasets.current.surface_data)
+    job = app.exporter.export(
+        titles,
+        lambda title: app.export_figure(title, annotations),
+        image_format=args.format,
+        width=args.width,
+        height=args.height,
+        scale=args.scale,
+    )
+    while not job.wait(1.0):
+        progress = job.progress()
+        print(f"{progress['done'] + progress['failed']}/{progress['total']}", file=sys.stderr, flush=True)
+    app.exporter.shutdown()
+
+    os.makedirs(args.out, exist_ok=True)
+    for title, path in job.paths.items():
+        shutil.copyfile(path, os.path.join(args.out, f"{title}.{args.format}"))
+
+    progress = job.progress()
+    print(json.dumps(progress, indent=2))
+    if progress["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    main()
+    print(f"Exported in {time.perf_counter() - start:.1f} s", file=sys.stderr)
@@ -0,0 +1,84 @@
+"""
+Exports every figure of the app to a static site, see helpers_wrappers/static_site.py.
+
+Run from `src`, with the same environment as the app (`SURFACE_ARTIFACT`, ...):
+
+    python export_site.py --out ../out/site [--lod 40000] [--workers 8]
+
+The site holds a page per pairing of the artifact and per view of the differences of the
+example surfaces (`DiffPlot`). Pages are written in parallel, one process per CPU.
+`--lod` is the number of vertices a page renders at most, see `lod.choose_tier`; the
+app's default detail tier is used without it.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import argparse
+import json
+import sys
+import time
+
+from helpers_wrappers.data_store import DIFF_PLOT_TITLES
+from helpers_wrappers.figure_store import serialize_figure
+from helpers_wrappers.static_site import slugify, write_bundle, write_index, write_page
+from helpers_wrappers.surface_plot_creation import DiffPlot
+
+
+def diff_plot():
+    # Every difference surface with its title, in the order of DIFF_PLOT_TITLES
+    return DiffPlot(*[value for item in DIFF_PLOT_TITLES.items() for value in item])
+
+
+DIFF_VIEWS = {
+    "Differences to 50m@15s": lambda: diff_plot().get_figure(),
+    "Differences to 50m@15s (one scene per surface)": lambda: diff_plot().get_subplot(),
+}
+
+
+def export_page(
+        out_dir,
+        title,
+        vertex_hint
+):
+    """
+    Builds a figure of the catalogue and writes its page. Runs in the export processes.
+    """
+    import app
+
+    if title in DIFF_VIEWS:
+        fig = DIFF_VIEWS[title]()
+    else:
+        fig = app.build_figure(app.figure_key(title, vertex_hint))
+    # Plain number lists, which the plotly.js of the site reads without any decoding
+    return write_page(out_dir, title, serialize_figure(fig, "round"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", required=True, help="Site directory")
+    parser.add_argument("--lod", type=int, default=None, help="Vertices a page renders at most")
+    parser.add_argument("--workers", type=int, default=None, help="Export processes, defaults to one per CPU")
+    args = parser.parse_args(argv)
+
+    import app
+
+    # Background threads don't survive the fork of the export processes
+    app.warmer.stop()
+    app.datasets.stop()
+
+    titles = list(app.datasets.current.surface_data) + list(DIFF_VIEWS)
+    slugs = [slugify(title) for title in titles]
+    if len(set(slugs)) != len(slugs):
+        raise ValueError("Figure titles must map to distinct file names")
+
+    write_bundle(args.out)
+    with ProcessPoolExecutor(args.workers) as executor:
+        pages = dict(zip(titles, executor.map(export_page, repeat(args.out), titles, repeat(args.lod))))
+    write_index(args.out, pages, title="SEE Index Visualisations")
+
+    print(json.dumps({"out": args.out, "pages": len(pages)}, indent=2))
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    main()
+    print(f"Exported in {time.perf_counter() - start:.1f} s", file=sys.stderr)
@@ -0,0 +1,38 @@
+"""
+Gunicorn settings, read from the working directory (see render.yaml).
+
+The app is loaded once in the master process and the workers are forked from it, so they
+share its memory copy-on-write instead of loading their own: the memory-mapped surface
+arrays, the resolution tiers and the figures built by `app.prewarm_figures` (the first
+page's and the popular ones, or every figure with `FIGURE_PREWARM=all`). Adding a worker
+then mostly costs the memory of what it builds itself afterwards.
+
+With `FIGURE_WARM_START=1`, the workers are forked right away and every worker builds the
+figures in the background instead, which trades memory for a faster start.
+"""
+import gc
+
+preload_app = True
+
+
+def when_ready(server):
+    # Runs in the master once the app is loaded, before the first worker is forked
+    import app
+
+    if not app.WARM_START:
+        app.prewarm_figures()
+    # Background threads don't survive the fork, every worker runs its own
+    app.warmer.stop()
+    app.datasets.stop()
+    # Collections walk and write to every tracked object, which would copy the shared
+    # pages into each worker; objects that exist before the fork are never collected
+    gc.collect()
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    import app
+
+    app.datasets.start()
+    if app.WARM_START:
+        app.warmer.start()
@@ -0,0 +1,278 @@
+"""
+Versioned on-disk format for the surface data used by the app.
+
+An artifact is a directory containing a `manifest.json` and one `.npy` file per group:
+
+    manifest.json
+    A01-<version>.npy
+    A02-<version>.npy
+    ...
+
+Each `<group>-<version>.npy` holds a single contiguous float32 array of shape (n_surfaces, ny, nx)
+with the z values of every surface in the group, already in the orientation expected by
+`go.Surface` (WPI tables are transposed when the artifact is written). The arrays are
+memory-mapped read-only when loaded, so start-up time does not depend on the size of
+the data and all workers on a host share the same pages through the OS cache.
+
+`manifest.json` has the following structure:
+
+    {
+        "format_version": 1,
+        "groups": {
+            "<group>": {
+                "file": "<group>-<version>.npy",
+                "names": [...],         # surface names, in the order of the first axis
+                "shape": [n_surfaces, ny, nx],
+                "dtype": "<f4",         # "<f8" in artifacts written before float32
+                "x": [...],             # nx values shared by all surfaces of the group
+                "y": [...],             # ny values shared by all surfaces of the group
+                "n_colors": {"<name>": int, ...},
+                "colorscales": {"<name>": [[scale_value, color], ...], ...},
+                "fingerprint": "<sha256>"   # optional, hash of the inputs of the group
+            },
+            ...
+        },
+        "pairings": ["<name_1>+<name_2>", ...]
+    }
+
+The version in the array file names is derived from the array contents, so a rebuild
+never overwrites a file that the current manifest points to. Replacing the manifest is
+the only step readers can observe: a worker that loads mid-rebuild sees either the old
+manifest with the old arrays or the new manifest with the new ones. The manifest is
+written last, so an artifact without a manifest is incomplete. Readers must reject
+artifacts whose `format_version` they don't know.
+"""
+from typing import Dict, List
+import hashlib
+import json
+import os
+import numpy as np
+
+from .colorscales import intern_colorscale
+from .surface_store import STORE_DTYPE, SurfaceStore
+
+FORMAT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+VERSION_LENGTH = 16
+
+
+def write_group(
+        out_dir: str,
+        group: str,
+        values: dict,
+        fingerprint: str = None
+) -> dict:
+    """
+    Writes the z array of a single group and returns its manifest entry.
+
+    Args:
+        out_dir (str): Artifact directory, created if it doesn't exist.
+        group (str): Group name, the array is written to `<group>-<version>.npy`, where the
+            version is a hash of the array.
+        values (dict): Dict with the keys `names`, `x`, `y`, `z` (array of shape
+            (n_surfaces, ny, nx)), `n_colors` and `colorscales`.
+        fingerprint (str, optional): Hash of the group's inputs, stored in the manifest
+            so incremental builds can skip unchanged groups. Defaults to None.
+
+    Raises:
+        ValueError: The z array doesn't match the names and axes of the group.
+
+    Returns:
+        dict: Manifest entry of the group.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    z = np.ascontiguousarray(values["z"], dtype=STORE_DTYPE)
+    expected_shape = (len(values["names"]), len(values["y"]), len(values["x"]))
+    if z.shape != expected_shape:
+        raise ValueError(f"Group {group} has z shape {z.shape}, expected {expected_shape}")
+
+    version = hashlib.sha256(z.tobytes()).hexdigest()[:VERSION_LENGTH]
+    file_name = f"{group}-{version}.npy"
+    tmp_path = os.path.join(out_dir, f"{file_name}.tmp")
+    with open(tmp_path, "wb") as file:
+        np.save(file, z, allow_pickle=False)
+    os.replace(tmp_path, os.path.join(out_dir, file_name))
+
+    entry = {
+        "file": file_name,
+        "names": list(values["names"]),
+        "shape": list(z.shape),
+        "dtype": z.dtype.str,
+        "x": [float(x) for x in values["x"]],
+        "y": [float(y) for y in values["y"]],
+        "n_colors": {name: int(n) for name, n in values["n_colors"].items()},
+        "colorscales": {
+            name: [[float(scale_value), color] for scale_value, color in colorscale]
+            for name, colorscale in values["colorscales"].items()
+        },
+    }
+    if fingerprint is not None:
+        entry["fingerprint"] = fingerprint
+
+    return entry
+
+
+def write_manifest(
+        out_dir: str,
+        groups: Dict[str, dict],
+        pairings: List[str]
+) -> str:
+    """
+    Writes the manifest, which completes the artifact.
+
+    Args:
+        out_dir (str): Artifact directory.
+        groups (Dict[str, dict]): Group name to manifest entry, as returned by `write_group`.
+        pairings (List[str]): Plot titles of the form "name_1+name_2".
+
+    Returns:
+        str: Path of the written manifest.
+    """
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "groups": groups,
+        "pairings": list(pairings),
+    }
+
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, "w") as file:
+        json.dump(manifest, file, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+    return manifest_path
+
+
+def remove_unreferenced(
+        out_dir: str,
+        *groups: Dict[str, dict]
+) -> List[str]:
+    """
+    Removes the `.npy` files of `out_dir` that no entry of `groups` points to.
+
+    Pass the groups of the previous manifest along with the current ones, so a reader that
+    has just read the previous manifest can still open its arrays; they are removed on the
+    next call.
+
+    Args:
+        out_dir (str): Artifact directory.
+        *groups (Dict[str, dict]): Manifest `groups` whose arrays are kept.
+
+    Returns:
+        List[str]: Names of the removed files.
+    """
+    referenced = set()
+    for entries in groups:
+        referenced.update(values["file"] for values in entries.values())
+
+    removed = []
+    for file_name in os.listdir(out_dir):
+        if file_name.endswith(".npy") and file_name not in referenced:
+            os.remove(os.path.join(out_dir, file_name))
+            removed.append(file_name)
+
+    return removed
+
+
+def write_artifact(
+        out_dir: str,
+        groups: Dict[str, dict],
+        pairings: List[str]
+) -> str:
+    """
+    Writes surface groups to `out_dir` in the artifact format described above.
+
+    Args:
+        out_dir (str): Directory to write to, created if it doesn't exist.
+        groups (Dict[str, dict]): Group name to values, see `write_group`.
+        pairings (List[str]): Plot titles of the form "name_1+name_2".
+
+    Returns:
+        str: Path of the written manifest.
+    """
+    entries = {group: write_group(out_dir, group, values) for group, values in groups.items()}
+    return write_manifest(out_dir, entries, pairings)
+
+
+def read_manifest(
+        path: str
+) -> dict:
+    """
+    Reads the manifest of an artifact without loading any arrays.
+
+    Raises:
+        ValueError: The artifact has an unsupported format version.
+    """
+    with open(os.path.join(path, MANIFEST_NAME)) as file:
+        manifest = json.load(file)
+
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported artifact format version {manifest.get('format_version')}, "
+            f"expected {FORMAT_VERSION}"
+        )
+
+    return manifest
+
+
+def load_artifact(
+        path: str
+) -> dict:
+    """
+    Loads an artifact, memory-mapping the z arrays of every group read-only.
+
+    Args:
+        path (str): Artifact directory.
+
+    Raises:
+        ValueError: The artifact has an unsupported format version, or an array doesn't
+            match the shape recorded in the manifest.
+
+    Returns:
+        dict: The manifest, with the memory-mapped array added as `z` to every group.
+    """
+    manifest = read_manifest(path)
+    for group, values in manifest["groups"].items():
+        z = np.load(os.path.join(path, values["file"]), mmap_mode="r", allow_pickle=False)
+        if list(z.shape) != values["shape"]:
+            raise ValueError(f"Group {group} has z shape {z.shape}, expected {values['shape']}")
+        values["z"] = z
+
+    return manifest
+
+
+def artifact_surface_data(
+        artifact: dict,
+        store: SurfaceStore = None
+) -> Dict[str, dict]:
+    """
+    Arranges a loaded artifact by plot title, in the shape used to build the figures:
+    `{plot_title: {name: {"surface": {"x", "y", "z"}, "colorscale", "n_colors"}}}`.
+
+    The z values are views into the stacked group arrays of `store`, nothing is copied per
+    surface. Equal colorscales are shared, see `colorscales.intern_colorscale`.
+
+    Args:
+        artifact (dict): Artifact as returned by `load_artifact`.
+        store (SurfaceStore, optional): Store of the artifact's surfaces. Created from the
+            artifact if None.
+
+    Returns:
+        Dict[str, dict]: Surface properties of both surfaces of every pairing.
+    """
+    if store is None:
+        store = SurfaceStore.from_artifact(artifact)
+
+    surfaces = {}
+    for values in artifact["groups"].values():
+        for name in values["names"]:
+            surfaces[name] = {
+                "surface": store.surface(name),
+                "colorscale": intern_colorscale(values["colorscales"][name]),
+                "n_colors": values["n_colors"][name],
+            }
+
+    return {
+        plot_title: {name: surfaces[name] for name in plot_title.split("+")}
+        for plot_title in artifact["pairings"]
+    }
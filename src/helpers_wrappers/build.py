@@ -0,0 +1,278 @@
+"""
+Incremental build of the app's surface artifact from a directory of raw tables.
+
+Run from `src`:
+
+    python -m helpers_wrappers.build <data_dir> [--out ../out/artifact] [--cache DIR]
+        [--pattern GLOB] [--watch [--interval SECONDS]]
+
+Every table is identified by the SHA-256 of its contents. The build cache keeps the hash
+of every file along with its size and modification time, and the parsed table of every
+hash, so on a rebuild only new or changed files are read and hashed. A group is only
+recomputed and rewritten when the hashes of its files differ from the fingerprint stored
+in the existing manifest. Rewritten groups go to new, versioned array files, so running
+apps never see a manifest paired with arrays from another build.
+
+With `--watch`, the data directory is polled and the artifact rebuilt whenever a matching
+file is added, changed or removed. Running apps pick up the new manifest on their own, see
+`dataset_registry.DatasetRegistry`.
+"""
+from typing import Dict, List, Tuple
+import argparse
+import hashlib
+import json
+import os
+import time
+import numpy as np
+
+from .artifact import read_manifest, remove_unreferenced, write_group, write_manifest
+from .grid_reader import read_grids
+from .surface import find_files, generate_plot_titles, group_of, group_surfaces, table_name
+
+CACHE_INDEX_NAME = "index.json"
+
+
+def file_hash(
+        file_path: str
+) -> str:
+    """
+    Returns the SHA-256 hex digest of a file's contents.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BuildCache:
+    """
+    Persistent cache of file hashes and parsed tables, stored in `cache_dir`.
+
+    Args:
+        cache_dir (str): Directory of the cache, created if it doesn't exist.
+    """
+
+    def __init__(
+            self,
+            cache_dir: str
+    ) -> None:
+        self.cache_dir = cache_dir
+        self.tables_dir = os.path.join(cache_dir, "tables")
+        os.makedirs(self.tables_dir, exist_ok=True)
+
+        self.index_path = os.path.join(cache_dir, CACHE_INDEX_NAME)
+        self.files: Dict[str, dict] = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as file:
+                self.files = json.load(file).get("files", {})
+
+        self.hashed = 0
+        self.parsed = 0
+
+    def hash(
+            self,
+            file_path: str
+    ) -> str:
+        """
+        Returns the content hash of `file_path`, only reading the file if its size or
+        modification time changed since it was last hashed.
+        """
+        stat = os.stat(file_path)
+        key = os.path.abspath(file_path)
+        cached = self.files.get(key)
+        if cached is not None and cached["size"] == stat.st_size and cached["mtime_ns"] == stat.st_mtime_ns:
+            return cached["sha256"]
+
+        sha256 = file_hash(file_path)
+        self.files[key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": sha256}
+        self.hashed += 1
+        return sha256
+
+    def tables(
+            self,
+            files: Dict[str, str],
+            hashes: Dict[str, str]
+    ) -> Dict[str, np.ndarray]:
+        """
+        Returns the parsed tables of `files`, parsing the ones that aren't cached yet in
+        parallel.
+
+        Args:
+            files (Dict[str, str]): Table name to file path.
+            hashes (Dict[str, str]): Table name to content hash.
+
+        Returns:
+            Dict[str, np.ndarray]: Table name to parsed table, in the order of `files`.
+        """
+        table_paths = {name: os.path.join(self.tables_dir, f"{hashes[name]}.npy") for name in files}
+        missing = [name for name in files if not os.path.exists(table_paths[name])]
+
+        parsed = dict(zip(missing, read_grids([files[name] for name in missing])))
+        for name, table in parsed.items():
+            tmp_path = f"{table_paths[name]}.tmp"
+            with open(tmp_path, "wb") as file:
+                np.save(file, table, allow_pickle=False)
+            os.replace(tmp_path, table_paths[name])
+        self.parsed += len(parsed)
+
+        return {
+            name: parsed[name] if name in parsed else np.load(table_paths[name], allow_pickle=False)
+            for name in files
+        }
+
+    def save(
+            self,
+            file_paths: List[str]
+    ) -> None:
+        """
+        Writes the index, dropping files that are no longer part of the data directory.
+        """
+        keep = {os.path.abspath(path) for path in file_paths}
+        self.files = {key: value for key, value in self.files.items() if key in keep}
+
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump({"files": self.files}, file, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+
+def group_fingerprint(
+        file_hashes: Dict[str, str]
+) -> str:
+    """
+    Hashes the names and content hashes of the files of a group, in order.
+    """
+    return hashlib.sha256(json.dumps(list(file_hashes.items())).encode("utf-8")).hexdigest()
+
+
+def build(
+        data_dir: str,
+        out_dir: str,
+        cache_dir: str = None,
+        pattern: str = "*"
+) -> dict:
+    """
+    Builds the artifact in `out_dir` from the tables in `data_dir`, reusing whatever the
+    build cache and the existing artifact allow.
+
+    Args:
+        data_dir (str): Directory that is searched recursively for tables.
+        out_dir (str): Artifact directory.
+        cache_dir (str, optional): Build cache directory. Defaults to `<out_dir>/.build_cache`.
+        pattern (str, optional): Glob the paths of the tables, relative to `data_dir`, must
+            match. Defaults to every file.
+
+    Returns:
+        dict: Build statistics: number of files, files hashed and parsed, and groups
+            rebuilt and reused.
+    """
+    cache = BuildCache(cache_dir or os.path.join(out_dir, ".build_cache"))
+
+    try:
+        previous_groups = read_manifest(out_dir)["groups"]
+    except (FileNotFoundError, ValueError):
+        previous_groups = {}
+
+    file_paths = [path for path in find_files(data_dir, pattern) if group_of(path) is not None]
+    group_files: Dict[str, Dict[str, str]] = {}
+    for path in file_paths:
+        group_files.setdefault(group_of(path), {})[table_name(path)] = path
+
+    entries = {}
+    rebuilt = []
+    for group, files in group_files.items():
+        hashes = {name: cache.hash(path) for name, path in files.items()}
+        fingerprint = group_fingerprint(hashes)
+
+        previous = previous_groups.get(group)
+        if (
+                previous is not None
+                and previous.get("fingerprint") == fingerprint
+                and os.path.exists(os.path.join(out_dir, previous["file"]))
+        ):
+            entries[group] = previous
+            continue
+
+        tables = cache.tables(files, hashes)
+        entries[group] = write_group(out_dir, group, group_surfaces(group, tables), fingerprint)
+        rebuilt.append(group)
+
+    write_manifest(out_dir, entries, generate_plot_titles(file_paths))
+    # Arrays of rebuilt or removed groups, kept for one build for readers of the old manifest
+    remove_unreferenced(out_dir, entries, previous_groups)
+    cache.save(file_paths)
+
+    return {
+        "files": len(file_paths),
+        "hashed": cache.hashed,
+        "parsed": cache.parsed,
+        "groups_rebuilt": rebuilt,
+        "groups_reused": [group for group in entries if group not in rebuilt],
+    }
+
+
+def snapshot(
+        data_dir: str,
+        pattern: str = "*"
+) -> Dict[str, Tuple[int, int]]:
+    """
+    Returns the size and modification time of every matching file, to detect changes
+    without reading any file.
+    """
+    result = {}
+    for path in find_files(data_dir, pattern):
+        stat = os.stat(path)
+        result[path] = (stat.st_size, stat.st_mtime_ns)
+    return result
+
+
+def watch(
+        data_dir: str,
+        out_dir: str,
+        cache_dir: str = None,
+        pattern: str = "*",
+        interval: float = 2.0
+) -> None:
+    """
+    Builds the artifact, then rebuilds it incrementally whenever a matching file in
+    `data_dir` is added, changed or removed. Runs until interrupted.
+    """
+    previous = None
+    while True:
+        current = snapshot(data_dir, pattern)
+        if current != previous:
+            start = time.perf_counter()
+            stats = build(data_dir, out_dir, cache_dir, pattern)
+            stats["seconds"] = round(time.perf_counter() - start, 4)
+            print(json.dumps(stats), flush=True)
+            previous = current
+        time.sleep(interval)
+
+
+def main(
+        argv: List[str] = None
+) -> None:
+    parser = argparse.ArgumentParser(
+        description="Build the surface artifact used by the app from a directory of tables."
+    )
+    parser.add_argument("data_dir", help="Directory that is searched recursively for tables")
+    parser.add_argument("--out", default="../out/artifact", help="Artifact directory")
+    parser.add_argument("--cache", default=None, help="Build cache directory, defaults to <out>/.build_cache")
+    parser.add_argument("--pattern", default="*", help="Glob for table paths relative to data_dir, e.g. '*/*.txt'")
+    parser.add_argument("--watch", action="store_true", help="Rebuild whenever the tables change")
+    parser.add_argument("--interval", type=float, default=2.0, help="Seconds between checks with --watch")
+    args = parser.parse_args(argv)
+
+    if args.watch:
+        watch(args.data_dir, args.out, args.cache, args.pattern, args.interval)
+        return
+
+    start = time.perf_counter()
+    stats = build(args.data_dir, args.out, args.cache, args.pattern)
+    stats["seconds"] = round(time.perf_counter() - start, 4)
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Registry of the colorscales used by the surfaces.
+
+Every palette in `COLOR_SCALES` can be turned into a stepped scale (one flat band per
+level, as the index levels of the surfaces are discrete) or a continuous scale (colors
+evenly spaced and interpolated by plotly). Scales are built with numpy, cached by
+(n_colors, palette, mode) and returned as tuples, so every surface with the same number of
+levels shares one immutable object.
+"""
+from functools import lru_cache
+from typing import List, Tuple
+import re
+import numpy as np
+from plotly.colors import sequential
+
+Colorscale = Tuple[Tuple[float, str], ...]
+
+COLORSCALE_MODES = ("stepped", "continuous")
+# Palettes that are sampled across their whole range instead of taking their first colors
+SEQUENTIAL_PALETTES = ("Viridis",)
+RGB_PATTERN = re.compile(r"rgb\(\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*\)")
+
+COLOR_SCALES: dict[str, List[str]] = {
+    'Set3': [
+        "#8DD3C7",
+        "#FFFFB3",
+        "#BEBADA",
+        "#FB8072",
+        "#80B1D3",
+        "#FDB462",
+        "#B3DE69",
+        "#FCCDE5",
+        "#D9D9D9",
+        "#BC80BD",
+        "#CCEBC5",
+        "#FFED6F",
+    ],
+    'R_rainbow_10': [
+        "#FF0000",
+        "#FF9900",
+        "#CCFF00",
+        "#33FF00",
+        "#00FF66",
+        "#00FFFF",
+        "#0066FF",
+        "#3300FF",
+        "#CC00FF",
+        "#FF0099",
+    ],
+    'D3': [
+        "#1f77b4",
+        "#ff7f0e",
+        "#2ca02c",
+        "#d62728",
+        "#9467bd",
+        "#8c564b",
+        "#e377c2",
+        "#7f7f7f",
+        "#bcbd22",
+        "#17becf",
+    ],
+    'Plotly': [
+        "#636efa",
+        "#EF553B",
+        "#00cc96",
+        "#ab63fa",
+        "#FFA15A",
+        "#19d3f3",
+        "#FF6692",
+        "#B6E880",
+        "#FF97FF",
+        "#FECB52",
+    ],
+    'G10': [
+        "#3366CC",
+        "#DC3912",
+        "#FF9900",
+        "#109618",
+        "#990099",
+        "#3B3EAC",
+        "#0099C6",
+        "#DD4477",
+        "#66AA00",
+        "#B82E2E",
+    ],
+    'Set1': [
+        "#e41a1c",
+        "#377eb8",
+        "#4daf4a",
+        "#984ea3",
+        "#ff7f00",
+        "#ffff33",
+        "#a65628",
+        "#f781bf",
+        "#999999",
+    ],
+    'Light24': [
+        '#FD3216', '#00FE35', '#6A76FC', '#FED4C4', '#FE00CE', '#0DF9FF', '#F6F926',
+        '#FF9616', '#479B55', '#EEA6FB', '#DC587D', '#D626FF', '#6E899C', '#00B5F7',
+        '#B68E00', '#C9FBE5', '#FF0092', '#22FFA7', '#E3EE9E', '#86CE00', '#BC7196',
+        '#7E7DCD', '#FC6955', '#E48F72'
+    ],
+    'Vivid': [
+        'rgb(229, 134, 6)', 'rgb(93, 105, 177)', 'rgb(82, 188, 163)', 'rgb(153, 201, 69)',
+        'rgb(204, 97, 176)', 'rgb(36, 121, 108)', 'rgb(218, 165, 27)', 'rgb(47, 138, 196)',
+        'rgb(118, 78, 159)', 'rgb(237, 100, 90)', 'rgb(165, 170, 153)'
+    ],
+    'Pastel': [
+        'rgb(102, 197, 204)', 'rgb(246, 207, 113)', 'rgb(248, 156, 116)',
+        'rgb(220, 176, 242)', 'rgb(135, 197, 95)', 'rgb(158, 185, 243)',
+        'rgb(254, 136, 177)', 'rgb(201, 219, 116)', 'rgb(139, 224, 164)',
+        'rgb(180, 151, 231)', 'rgb(179, 179, 179)'
+    ],
+    'Viridis': list(sequential.Viridis),
+}
+
+
+def parse_color(
+        color: str
+) -> Tuple[int, int, int]:
+    """
+    Returns the RGB components of a `#rrggbb` or `rgb(r, g, b)` color.
+
+    Raises:
+        ValueError: `color` is in neither format.
+    """
+    if color.startswith("#") and len(color) == 7:
+        return int(color[1:3], 16), int(color[3:5], 16), int(color[5:7], 16)
+    match = RGB_PATTERN.fullmatch(color)
+    if match is None:
+        raise ValueError(f"Unsupported color {color}")
+    return int(match[1]), int(match[2]), int(match[3])
+
+
+@lru_cache(maxsize=None)
+def palette_colors(
+        n_colors: int,
+        palette: str = "Set3"
+) -> Tuple[str, ...]:
+    """
+    Returns `n_colors` colors of a palette: its first `n_colors` colors, or, if it has fewer
+    or is in `SEQUENTIAL_PALETTES`, colors interpolated evenly across the palette.
+
+    Raises:
+        ValueError: `palette` is not in `COLOR_SCALES`.
+    """
+    if palette not in COLOR_SCALES:
+        raise ValueError(f"Palette {palette} not found in COLOR_SCALES")
+
+    colors = COLOR_SCALES[palette]
+    if n_colors <= len(colors) and palette not in SEQUENTIAL_PALETTES:
+        return tuple(colors[:n_colors])
+
+    rgb = np.array([parse_color(color) for color in colors], dtype=np.float64)
+    positions = np.linspace(0, len(colors) - 1, n_colors)
+    interpolated = np.column_stack(
+        [np.interp(positions, np.arange(len(colors)), rgb[:, channel]) for channel in range(3)]
+    )
+    return tuple(f"rgb({r}, {g}, {b})" for r, g, b in np.rint(interpolated).astype(int))
+
+
+@lru_cache(maxsize=None)
+def get_colorscale(
+        n_colors: int,
+        palette: str = "Set3",
+        mode: str = "stepped"
+) -> Colorscale:
+    """
+    Returns the colorscale for `n_colors` levels, shared between all callers.
+
+    Args:
+        n_colors (int): Number of levels.
+        palette (str, optional): Name of a palette in `COLOR_SCALES`. Defaults to "Set3".
+        mode (str, optional): "stepped" for one flat band per level, "continuous" for colors
+            evenly spaced from 0 to 1. Defaults to "stepped".
+
+    Raises:
+        ValueError: `palette` or `mode` is unknown, or `n_colors` is smaller than 1.
+
+    Returns:
+        Colorscale: Tuple of (scaled_value, color) tuples.
+    """
+    if mode not in COLORSCALE_MODES:
+        raise ValueError(f"Unknown colorscale mode {mode}, expected one of {COLORSCALE_MODES}")
+    if n_colors < 1:
+        raise ValueError("n_colors must be at least 1")
+
+    colors = palette_colors(n_colors, palette)
+    if mode == "stepped":
+        edges = np.linspace(0, 1, n_colors + 1)
+        # Every color spans from its lower to its upper edge
+        scaled_values = np.column_stack([edges[:-1], edges[1:]]).ravel()
+        colors = [color for color in colors for _ in range(2)]
+    elif n_colors == 1:
+        scaled_values = np.array([0.0, 1.0])
+        colors = colors * 2
+    else:
+        scaled_values = np.linspace(0, 1, n_colors)
+
+    return tuple(zip(scaled_values.tolist(), colors))
+
+
+def intern_colorscale(
+        colorscale: List[List]
+) -> Colorscale:
+    """
+    Returns a shared, immutable copy of a colorscale read from elsewhere (e.g. an artifact
+    manifest), so equal colorscales are only kept in memory once.
+    """
+    return _interned(tuple((float(scaled_value), color) for scaled_value, color in colorscale))
+
+
+@lru_cache(maxsize=None)
+def _interned(
+        colorscale: Colorscale
+) -> Colorscale:
+    return colorscale
@@ -0,0 +1,211 @@
+"""
+Lazy, indexable view of every combination (overlay) of the surfaces of a group.
+
+`register_combination_route` pages through them over HTTP:
+`GET /combinations/<group>?r=<size>&page=<n>&page_size=<n>` answers
+`{"group", "r", "total", "page", "combinations": [{"index", "names"}, ...]}`. `index` is the
+rank of the combination among all sizes, `GET /combinations/<group>/<index>` returns that
+combination again. The power set of a group is never enumerated.
+"""
+from math import comb
+from typing import Callable, Iterator, List, Sequence, Union
+import flask
+
+# Largest page of combinations a request can ask for
+MAX_PAGE_SIZE = 500
+
+
+class CombinationIndex:
+    """
+    Lazy, indexable view of every combination of every size of `names`.
+
+    Combinations are ordered by size and then lexicographically by the position of the
+    names, the same order as chaining `itertools.combinations(names, r)` for r = 1..n.
+    Counting, ranking and unranking are computed arithmetically, so no combination is
+    created until it is asked for and memory doesn't grow with the 2^n - 1 combinations.
+
+    Args:
+        names (Sequence[str]): Names to combine, must be unique.
+    """
+
+    def __init__(
+            self,
+            names: Sequence[str]
+    ) -> None:
+        self.names = list(names)
+        self.positions = {name: i for i, name in enumerate(self.names)}
+        if len(self.positions) != len(self.names):
+            raise ValueError("Names must be unique")
+        # There's no `__len__`, as it can't return more than sys.maxsize (63 or more
+        # names), use `count()` instead
+        self.total = 2 ** len(self.names) - 1
+
+    def count(
+            self,
+            r: int = None
+    ) -> int:
+        """
+        Returns the number of combinations of size `r`, or of all sizes if `r` is None.
+        """
+        if r is None:
+            return self.total
+        return comb(len(self.names), r) if 1 <= r <= len(self.names) else 0
+
+    def offset(
+            self,
+            r: int
+    ) -> int:
+        """
+        Returns the index of the first combination of size `r`.
+        """
+        return sum(comb(len(self.names), k) for k in range(1, r))
+
+    def rank(
+            self,
+            combination: Sequence[str]
+    ) -> int:
+        """
+        Returns the index of `combination`. The order of the names in it doesn't matter.
+
+        Raises:
+            ValueError: `combination` is empty, contains duplicates or unknown names.
+        """
+        try:
+            indices = sorted(self.positions[name] for name in combination)
+        except KeyError as exc:
+            raise ValueError(f"Unknown name {exc.args[0]}") from None
+        if not indices or len(set(indices)) != len(indices):
+            raise ValueError("Combination must be non-empty and contain each name at most once")
+
+        n, r = len(self.names), len(indices)
+        index = self.offset(r)
+        previous = -1
+        for position, current in enumerate(indices):
+            remaining = r - position
+            # Skip all combinations that pick a smaller name at this position
+            for skipped in range(previous + 1, current):
+                index += comb(n - skipped - 1, remaining - 1)
+            previous = current
+
+        return index
+
+    def unrank(
+            self,
+            index: int
+    ) -> List[str]:
+        """
+        Returns the combination at `index`.
+
+        Raises:
+            IndexError: `index` is out of range.
+        """
+        if index < 0:
+            index += self.total
+        if not 0 <= index < self.total:
+            raise IndexError("Combination index out of range")
+
+        n, r = len(self.names), 1
+        while index >= comb(n, r):
+            index -= comb(n, r)
+            r += 1
+
+        combination = []
+        current = 0
+        for remaining in range(r, 0, -1):
+            # Number of combinations that pick `current` at this position
+            while index >= comb(n - current - 1, remaining - 1):
+                index -= comb(n - current - 1, remaining - 1)
+                current += 1
+            combination.append(self.names[current])
+            current += 1
+
+        return combination
+
+    def __getitem__(
+            self,
+            key: Union[int, slice]
+    ) -> Union[List[str], List[List[str]]]:
+        if isinstance(key, slice):
+            return [self.unrank(i) for i in range(*key.indices(self.total))]
+        return self.unrank(key)
+
+    def __iter__(
+            self
+    ) -> Iterator[List[str]]:
+        return (self.unrank(i) for i in range(self.total))
+
+    def page(
+            self,
+            page: int,
+            page_size: int,
+            r: int = None
+    ) -> List[List[str]]:
+        """
+        Returns one page of combinations, optionally only those of size `r`.
+
+        Args:
+            page (int): Zero-based page number.
+            page_size (int): Number of combinations per page.
+            r (int, optional): Size of the combinations. Defaults to all sizes.
+
+        Returns:
+            List[List[str]]: The combinations of the page, empty past the last page.
+        """
+        start = page * page_size
+        if r is None:
+            return self[start:start + page_size]
+
+        first = self.offset(r)
+        indices = range(first, first + self.count(r))
+        return [self.unrank(i) for i in indices[start:start + page_size]]
+
+
+def register_combination_route(
+        server: flask.Flask,
+        group_names: Callable[[str], Sequence[str]],
+        route: str = "/combinations"
+) -> None:
+    """
+    Adds the combination endpoints to a Flask server, see the module docstring.
+
+    Args:
+        server (flask.Flask): Server to add the routes to, usually `app.server`.
+        group_names (Callable[[str], Sequence[str]]): Returns the surface names of a group
+            of the current surfaces, raises KeyError for unknown groups.
+        route (str, optional): Path of the endpoints. Defaults to "/combinations".
+    """
+
+    def group_index(group: str) -> CombinationIndex:
+        try:
+            return CombinationIndex(group_names(group))
+        except KeyError:
+            flask.abort(404)
+
+    @server.route(f"{route}/<group>")
+    def combination_page(group):
+        index = group_index(group)
+        r = flask.request.args.get("r", type=int)
+        page = flask.request.args.get("page", 0, type=int)
+        page_size = flask.request.args.get("page_size", 50, type=int)
+        if page < 0 or not 1 <= page_size <= MAX_PAGE_SIZE:
+            return flask.jsonify(error=f"page must be >= 0 and page_size within 1..{MAX_PAGE_SIZE}"), 400
+
+        first = (0 if r is None else index.offset(r)) + page * page_size
+        return flask.jsonify(
+            group=group,
+            r=r,
+            total=index.count(r),
+            page=page,
+            combinations=[
+                {"index": first + i, "names": names}
+                for i, names in enumerate(index.page(page, page_size, r))
+            ]
+        )
+
+    @server.route(f"{route}/<group>/<int:rank>")
+    def combination(group, rank):
+        try:
+            names = group_index(group).unrank(rank)
+        except IndexError:
+            flask.abort(404)
+        return flask.jsonify(group=group, index=rank, names=names)
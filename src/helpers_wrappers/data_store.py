@@ -1,15 +1,15 @@
 import numpy as np
-import pandas as pd
 from .plotly_helpers import make_colorscale_distinct
+from .grid_reader import read_grids
+from .surface_store import SurfaceGroup
+from .startup_report import STARTUP_REPORT
 from typing import Dict
+import os
 
-# Hard coded for now. TODO: Refactor to be dynamic
-FILES = [
-    "../data/25m@10s.txt",
-    "../data/50m@10s.txt",
-    "../data/25m@15s.txt",
-    "../data/50m@15s.txt"
-]
+SURFACE_NAMES = ["25m@10s", "50m@10s", "25m@15s", "50m@15s"]
+# Tables of the example surfaces, one `<name>.txt` per surface
+DATA_DIR = os.environ.get("SURFACE_DATA_DIR", "../data")
+FILES = [os.path.join(DATA_DIR, f"{name}.txt") for name in SURFACE_NAMES]
 
 PLOT_TITLES: Dict[str, str] = {
     "25m50m@10s": "SEE index at 25m and 50m <br> Influence of current and wave (10s wave period)",
@@ -33,40 +33,20 @@ AXIS_TITLES = [
 
 X = np.linspace(0, 10, 21)
 Y = np.linspace(0, 1.5, 16)
-Z_VALUES = [
-    pd.read_table(FILES[0], header=None).to_numpy(),  # 25m@10s
-    pd.read_table(FILES[1], header=None).to_numpy(),  # 50m@10s
-    pd.read_table(FILES[2], header=None).to_numpy(),  # 25m@15s
-    pd.read_table(FILES[3], header=None).to_numpy(),   # 50m@15s
-]
+with STARTUP_REPORT.phase("ingestion"):
+    Z_VALUES = read_grids(FILES)
 
-Z_DIFFS = [
-    (Z_VALUES[3]/np.max(Z_VALUES[3])) * 100,
-    (Z_VALUES[0]/np.max(Z_VALUES[3])) * 100,
-    (Z_VALUES[2]/np.max(Z_VALUES[3])) * 100,
-    (Z_VALUES[1]/np.max(Z_VALUES[3])) * 100,
-]
+STORE = SurfaceGroup(SURFACE_NAMES, X, Y, np.stack(Z_VALUES))
 
-N_COLORS = {
-    "25m@10s": int(np.ceil(np.max(Z_VALUES[0])) // 2),
-    "50m@10s": int(np.ceil(np.max(Z_VALUES[1])) // 2),
-    "25m@15s": int(np.ceil(np.max(Z_VALUES[2])) // 2),
-    "50m@15s": int(np.ceil(np.max(Z_VALUES[3])) // 2),
-}
+with STARTUP_REPORT.phase("differences"):
+    Z_DIFFS = STORE.differences.differences("50m@15s", ["50m@15s", "25m@10s", "25m@15s", "50m@10s"])
 
-SURFACE_COLORS = {
-    "25m@10s": make_colorscale_distinct(N_COLORS["25m@10s"]),
-    "50m@10s": make_colorscale_distinct(N_COLORS["50m@10s"]),
-    "25m@15s": make_colorscale_distinct(N_COLORS["25m@15s"]),
-    "50m@15s": make_colorscale_distinct(N_COLORS["50m@15s"]),
-}
+with STARTUP_REPORT.phase("colorscales"):
+    N_COLORS = dict(zip(SURFACE_NAMES, (np.ceil(STORE.max_values) // 2).astype(int).tolist()))
 
-SURFACES = {
-    "25m@10s": {"x": X, "y": Y, "z": Z_VALUES[0]},
-    "50m@10s": {"x": X, "y": Y, "z": Z_VALUES[1]},
-    "25m@15s": {"x": X, "y": Y, "z": Z_VALUES[2]},
-    "50m@15s": {"x": X, "y": Y, "z": Z_VALUES[3]},
-}
+    SURFACE_COLORS = {name: make_colorscale_distinct(N_COLORS[name]) for name in SURFACE_NAMES}
+
+SURFACES = {name: STORE.surface(name) for name in SURFACE_NAMES}
 
 DIFF_SURFACES = {
     "50m@15s_self": {"x": X, "y": Y, "z": Z_DIFFS[0]},
@@ -0,0 +1,198 @@
+"""
+Live view of the surface artifact that follows rebuilds without restarting the app.
+
+`DatasetRegistry` polls the artifact's manifest, which the build replaces atomically as its
+last step. When it changes, the new manifest is loaded and swapped in as a whole, and the
+registered listeners are told which surfaces changed, by comparing the fingerprints of the
+groups. Groups whose fingerprint is unchanged keep their identity (`Dataset.revision`), so
+anything cached for them, such as built figures, stays valid.
+"""
+from typing import Callable, Dict, List, NamedTuple, Optional, Set
+import logging
+import os
+import threading
+
+from .artifact import MANIFEST_NAME, artifact_surface_data, load_artifact
+from .point_query import PointQuery
+from .search_index import PairingSearchIndex
+from .startup_report import STARTUP_REPORT
+from .surface_store import SurfaceStore
+
+logger = logging.getLogger(__name__)
+
+
+class Dataset(NamedTuple):
+    """
+    Everything the app derives from one version of the artifact.
+    """
+    artifact: dict
+    store: SurfaceStore
+    surface_data: Dict[str, dict]
+    search_index: PairingSearchIndex
+    points: PointQuery
+    # Group name to an identifier that changes whenever the group's data changes
+    group_revisions: Dict[str, str]
+
+    def revision(
+            self,
+            name: str
+    ) -> str:
+        """
+        Returns the revision of the group of the surface `name`.
+        """
+        return self.group_revisions[self.store.group_of[name]]
+
+
+def load_dataset(
+        path: str,
+        version: int = 0
+) -> Dataset:
+    """
+    Loads an artifact and everything derived from it.
+
+    Args:
+        path (str): Artifact directory.
+        version (int, optional): Load counter, used as the revision of groups that have no
+            fingerprint in the manifest. Defaults to 0.
+
+    Returns:
+        Dataset: The loaded dataset.
+    """
+    artifact = load_artifact(path)
+    store = SurfaceStore.from_artifact(artifact)
+    with STARTUP_REPORT.phase("search index"):
+        search_index = PairingSearchIndex.from_artifact(artifact)
+    return Dataset(
+        artifact=artifact,
+        store=store,
+        surface_data=artifact_surface_data(artifact, store),
+        search_index=search_index,
+        points=PointQuery(store),
+        group_revisions={
+            group: values.get("fingerprint", f"load-{version}")
+            for group, values in artifact["groups"].items()
+        },
+    )
+
+
+class DatasetRegistry:
+    """
+    Holds the current `Dataset` of an artifact directory and reloads it when the artifact
+    is rebuilt.
+
+    Reads go through `current`, which is replaced in a single assignment, so a request
+    always sees one consistent version.
+
+    Args:
+        path (str): Artifact directory.
+        poll_interval (float, optional): Seconds between checks of the manifest once
+            `start` has been called, 0 disables them. Defaults to 2.
+    """
+
+    def __init__(
+            self,
+            path: str,
+            poll_interval: float = 2.0
+    ) -> None:
+        self.path = path
+        self.poll_interval = poll_interval
+        self.version = 0
+        self._manifest_stat = self._stat_manifest()
+        self.current = load_dataset(path)
+        self._listeners: List[Callable[[Dataset, Dataset, Set[str]], None]] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __contains__(
+            self,
+            plot_title: str
+    ) -> bool:
+        return plot_title in self.current.surface_data
+
+    def _stat_manifest(
+            self
+    ) -> tuple:
+        stat = os.stat(os.path.join(self.path, MANIFEST_NAME))
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    def add_listener(
+            self,
+            listener: Callable[[Dataset, Dataset, Set[str]], None]
+    ) -> None:
+        """
+        Registers `listener(old, new, changed_names)`, called after every reload with the
+        names of the surfaces that were added, changed or removed.
+        """
+        self._listeners.append(listener)
+
+    def reload(
+            self
+    ) -> Set[str]:
+        """
+        Reloads the artifact if its manifest changed.
+
+        Returns:
+            Set[str]: Names of the surfaces that were added, changed or removed, empty if
+                nothing was reloaded.
+        """
+        try:
+            manifest_stat = self._stat_manifest()
+        except FileNotFoundError:
+            return set()
+        if manifest_stat == self._manifest_stat:
+            return set()
+
+        self.version += 1
+        old = self.current
+        new = load_dataset(self.path, self.version)
+        changed = set()
+        for group in set(old.group_revisions) | set(new.group_revisions):
+            if old.group_revisions.get(group) != new.group_revisions.get(group):
+                for dataset in (old, new):
+                    if group in dataset.store.groups:
+                        changed.update(dataset.store.groups[group].names)
+
+        self._manifest_stat = manifest_stat
+        self.current = new
+        logger.info("Reloaded %s, %d surfaces changed", self.path, len(changed))
+        for listener in self._listeners:
+            listener(old, new, changed)
+
+        return changed
+
+    def _poll(
+            self
+    ) -> None:
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.reload()
+            except Exception:
+                # A half-written or invalid artifact must not stop the app or the watcher
+                logger.exception("Reloading %s failed", self.path)
+
+    def start(
+            self
+    ) -> None:
+        """
+        Starts checking the manifest in a daemon thread. Does nothing if `poll_interval`
+        is 0.
+
+        Threads don't survive a fork, so a server that forks its workers from a loaded app
+        (gunicorn's `preload_app`) must `stop` the registry before forking and `start` it
+        in every worker, see gunicorn.conf.py.
+        """
+        if self._thread is None and self.poll_interval > 0:
+            self._stop = threading.Event()
+            self._thread = threading.Thread(target=self._poll, name="dataset-registry", daemon=True)
+            self._thread.start()
+
+    def stop(
+            self
+    ) -> None:
+        """
+        Stops checking the manifest, waiting for a reload in progress to finish.
+        """
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,133 @@
+"""
+Differences of surfaces to a reference surface, computed over a stacked array.
+
+All surfaces of a stack share one grid, so the differences of any set of them to any
+reference are a single broadcast operation over the `(n, ny, nx)` stack instead of one
+Python-level computation per pair.
+"""
+from collections import OrderedDict
+from typing import Dict, Sequence, Tuple
+import threading
+import numpy as np
+
+# normalised  - surface / max(reference) * 100
+# percentage  - |surface - reference| / (max(reference) - min(reference)) * 100, a flat
+#               reference has no range and gives |surface - reference| * 100
+DIFFERENCE_METHODS = ("normalised", "percentage")
+
+
+def difference_stack(
+        reference: np.ndarray,
+        surfaces: np.ndarray,
+        method: str = "normalised"
+) -> np.ndarray:
+    """
+    Computes the differences of a stack of surfaces to a reference in one operation.
+
+    Args:
+        reference (np.ndarray): Reference surface of shape (ny, nx).
+        surfaces (np.ndarray): Surfaces of shape (n, ny, nx).
+        method (str, optional): One of `DIFFERENCE_METHODS`. Defaults to "normalised".
+
+    Raises:
+        ValueError: `method` is unknown.
+
+    Returns:
+        np.ndarray: Differences of shape (n, ny, nx).
+    """
+    if method == "normalised":
+        return surfaces / np.max(reference) * 100
+    if method == "percentage":
+        value_range = np.max(reference) - np.min(reference)
+        if value_range == 0:
+            value_range = 1
+        return np.abs(surfaces - reference) / value_range * 100
+    raise ValueError(f"Unknown difference method {method}, expected one of {DIFFERENCE_METHODS}")
+
+
+class DifferenceEngine:
+    """
+    Computes and caches differences between the surfaces of a stacked array.
+
+    Results are cached by (reference, surfaces, method), the least recently used results
+    are dropped once more than `max_entries` are cached. Cached arrays are read-only, as
+    they are shared by every caller.
+
+    Args:
+        names (Sequence[str]): Name of every surface of `z`, in order.
+        z (np.ndarray): Stacked surfaces of shape (n, ny, nx).
+        max_entries (int, optional): Number of cached results. Defaults to 64.
+        decimals (int, optional): Decimals the surfaces are rounded to once widened to
+            float64, before any arithmetic. Recovers the exact values of a float32 stack
+            of data with known precision. Defaults to None, no rounding.
+    """
+
+    def __init__(
+            self,
+            names: Sequence[str],
+            z: np.ndarray,
+            max_entries: int = 64,
+            decimals: int = None
+    ) -> None:
+        if len(names) != len(z):
+            raise ValueError(f"Got {len(names)} names for {len(z)} surfaces")
+        self.positions: Dict[str, int] = {name: i for i, name in enumerate(names)}
+        self.z = z
+        self.max_entries = max_entries
+        self.decimals = decimals
+        self._cache: "OrderedDict[Tuple[str, Tuple[str, ...], str], np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def differences(
+            self,
+            reference: str,
+            names: Sequence[str] = None,
+            method: str = "normalised"
+    ) -> np.ndarray:
+        """
+        Returns the differences of surfaces to a reference surface.
+
+        Args:
+            reference (str): Name of the reference surface.
+            names (Sequence[str], optional): Names of the surfaces to compare, in the order
+                of the result. Defaults to every surface.
+            method (str, optional): One of `DIFFERENCE_METHODS`. Defaults to "normalised".
+
+        Raises:
+            KeyError: `reference` or one of `names` is unknown.
+            ValueError: `method` is unknown.
+
+        Returns:
+            np.ndarray: Read-only differences of shape (len(names), ny, nx).
+        """
+        names = tuple(self.positions) if names is None else tuple(names)
+        key = (reference, names, method)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        positions = [self.positions[reference]] + [self.positions[name] for name in names]
+        z = np.asarray(self.z[positions], dtype=np.float64)
+        if self.decimals is not None:
+            z = np.round(z, self.decimals)
+        result = difference_stack(z[0], z[1:], method)
+        result.setflags(write=False)
+
+        with self._lock:
+            self._cache[key] = result
+            if len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+        return result
+
+    def difference(
+            self,
+            reference: str,
+            name: str,
+            method: str = "normalised"
+    ) -> np.ndarray:
+        """
+        Returns the difference of a single surface to a reference surface, see `differences`.
+        """
+        return self.differences(reference, [name], method)[0]
@@ -0,0 +1,59 @@
+"""
+Read-only HTTP endpoint for the cached figures, next to the Dash callback path.
+
+`GET /figures/<plot title>` returns the figure JSON, brotli or gzip compressed when the
+client accepts it. An optional `lod` query argument is the number of vertices the client
+wants to render at most, see `lod.choose_tier`. The bodies are compressed once, when the figure is built (see
+`FigureCache` with `precompress=True`). Every response carries a weak ETag derived from
+the figure JSON, so a client or CDN that revalidates with `If-None-Match` gets an empty
+304 response until the data changes.
+"""
+from typing import Callable, Container, Hashable
+import flask
+
+from .figure_store import FigureCache
+
+CACHE_CONTROL = "public, no-cache"
+
+
+def register_figure_route(
+        server: flask.Flask,
+        figures: FigureCache,
+        titles: Container[str],
+        figure_key: Callable[[str, int], Hashable],
+        route: str = "/figures/<path:title>"
+) -> None:
+    """
+    Adds the figure endpoint to a Flask server.
+
+    Args:
+        server (flask.Flask): Server to add the route to, usually `app.server`.
+        figures (FigureCache): Cache the figures are taken from.
+        titles (Container[str]): Plot titles that can be requested, other titles get a 404.
+        figure_key (Callable[[str, int], Hashable]): Returns the key of the figure in
+            `figures` for a plot title and the `lod` argument, None if it isn't given.
+        route (str, optional): URL rule of the endpoint, must contain `<path:title>`.
+            Defaults to "/figures/<path:title>".
+    """
+
+    @server.route(route)
+    def serve_figure(title):
+        if title not in titles:
+            flask.abort(404)
+
+        entry = figures.get_entry(figure_key(title, flask.request.args.get("lod", type=int)))
+        if flask.request.if_none_match.contains_weak(entry.etag):
+            response = flask.Response(status=304)
+        else:
+            # Ties in the client's preferences go to the first, smallest, coding
+            coding = flask.request.accept_encodings.best_match(list(entry.compressed) + ["identity"])
+            if coding in entry.compressed:
+                response = flask.Response(entry.compressed[coding], mimetype="application/json")
+                response.headers["Content-Encoding"] = coding
+            else:
+                response = flask.Response(entry.json, mimetype="application/json")
+
+        response.set_etag(entry.etag, weak=True)
+        response.headers["Cache-Control"] = CACHE_CONTROL
+        response.vary.add("Accept-Encoding")
+        return response
@@ -0,0 +1,430 @@
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Dict, Hashable, List, NamedTuple
+import base64
+import gzip
+import hashlib
+import json
+import threading
+import numpy as np
+import plotly.graph_objects as go
+import plotly.io as pio
+
+from .startup_report import STARTUP_REPORT
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+JSON_ENGINE = "orjson" if orjson is not None else "json"
+
+# Callback responses are encoded by plotly's `to_json_plotly`. With orjson, figures that
+# only contain plain Python types are dumped directly without walking them first.
+pio.json.config.default_engine = JSON_ENGINE
+
+# How the coordinate arrays of the traces are written:
+#   json  - float64 number lists, as plotly writes them
+#   round - number lists rounded to `ARRAY_DECIMALS`, which drops float noise such as
+#           0.30000000000000004 from the payload
+#   typed - rounded, down-cast to float32 and base64 encoded as
+#           {"dtype": "f4", "shape": [...], "bdata": "..."}, decoded in the browser by
+#           assets/figure.js (the plotly.js bundled with dash 2.9 can't read them itself)
+FIGURE_ENCODINGS = ("json", "round", "typed")
+ARRAY_DECIMALS = 2
+ARRAY_KEYS = ("x", "y", "z")
+
+
+def encode_array(
+        values: np.ndarray,
+        encoding: str
+) -> object:
+    """
+    Encodes a coordinate array of a trace, see `FIGURE_ENCODINGS`.
+    """
+    rounded = np.round(np.asarray(values, dtype=np.float64), ARRAY_DECIMALS)
+    if encoding == "round":
+        return rounded
+
+    array = np.ascontiguousarray(rounded, dtype="<f4")
+    return {
+        "dtype": "f4",
+        "shape": list(array.shape),
+        "bdata": base64.b64encode(array.tobytes()).decode("ascii"),
+    }
+
+
+def serialize_figure(
+        fig: go.Figure,
+        encoding: str = "json"
+) -> bytes:
+    """
+    Serializes a figure to JSON once, so the plotly validators and the encoding of numpy
+    arrays only run when the figure is built instead of on every request.
+
+    Args:
+        fig (go.Figure): Figure to serialize.
+        encoding (str, optional): Encoding of the trace coordinate arrays, one of
+            `FIGURE_ENCODINGS`. Defaults to "json".
+
+    Returns:
+        bytes: UTF-8 encoded figure JSON.
+
+    Raises:
+        ValueError: `encoding` is unknown.
+    """
+    if encoding not in FIGURE_ENCODINGS:
+        raise ValueError(f"Unknown figure encoding {encoding}, expected one of {FIGURE_ENCODINGS}")
+    if encoding == "json":
+        return pio.to_json(fig, validate=False, engine=JSON_ENGINE).encode("utf-8")
+
+    figure = fig.to_plotly_json()
+    figure["data"] = [
+        {
+            key: encode_array(value, encoding) if key in ARRAY_KEYS and value is not None else value
+            for key, value in trace.items()
+        }
+        for trace in figure["data"]
+    ]
+    return pio.to_json(figure, validate=False, engine=JSON_ENGINE).encode("utf-8")
+
+
+def load_json(
+        figure_json: bytes
+) -> dict:
+    """
+    Decodes figure JSON with the fastest available decoder.
+    """
+    return orjson.loads(figure_json) if orjson is not None else json.loads(figure_json)
+
+
+def pack_arrays(
+        figure: dict
+) -> dict:
+    """
+    Replaces the coordinate number lists of the traces of a decoded figure by read-only
+    numpy arrays, in place.
+
+    A list of floats is one Python object per value, each of them written to whenever the
+    figure is encoded (reference counts), which un-shares the pages of figures built before
+    the workers of a server were forked. An array is a single object over one buffer that
+    is only ever read, and it is encoded to the same JSON.
+
+    Args:
+        figure (dict): Figure as returned by `load_json`.
+
+    Returns:
+        dict: `figure`.
+    """
+    for trace in figure.get("data", []):
+        for key in ARRAY_KEYS:
+            if isinstance(trace.get(key), list):
+                array = np.asarray(trace[key])
+                # Ragged lists and lists with gaps (None) stay lists
+                if array.dtype.kind in "iuf":
+                    array.setflags(write=False)
+                    trace[key] = array
+    return figure
+
+
+# Quality settings of the precompressed figure payloads, high but still fast enough to run
+# when a figure is first built
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 9
+
+
+def compress_figure(
+        figure_json: bytes
+) -> Dict[str, bytes]:
+    """
+    Compresses serialized figure JSON with every available content coding.
+
+    Args:
+        figure_json (bytes): Serialized figure.
+
+    Returns:
+        Dict[str, bytes]: Content coding ("br", "gzip") to compressed bytes, in order of
+            preference. Brotli is only included if the `brotli` package is installed.
+    """
+    compressed = {}
+    if brotli is not None:
+        compressed["br"] = brotli.compress(figure_json, quality=BROTLI_QUALITY)
+    # A fixed mtime keeps the output, and with it any cache keyed on it, reproducible
+    compressed["gzip"] = gzip.compress(figure_json, GZIP_LEVEL, mtime=0)
+    return compressed
+
+
+def array_nbytes(
+        figure: dict
+) -> int:
+    """
+    Returns the bytes held by the coordinate arrays of the traces of a decoded figure: the
+    buffers of the arrays of `pack_arrays`, or the base64 strings of typed arrays.
+    """
+    nbytes = 0
+    for trace in figure.get("data", []):
+        for key in ARRAY_KEYS:
+            value = trace.get(key)
+            if isinstance(value, np.ndarray):
+                nbytes += value.nbytes
+            elif isinstance(value, dict) and "bdata" in value:
+                nbytes += len(value["bdata"])
+    return nbytes
+
+
+class FigureEntry(NamedTuple):
+    """
+    A cached figure: the serialized JSON, the figure decoded from it, a content hash of
+    the JSON and, if the cache precompresses, the JSON per content coding.
+    """
+    json: bytes
+    figure: dict
+    etag: str
+    compressed: Dict[str, bytes]
+
+    @property
+    def size(
+            self
+    ) -> int:
+        """
+        Estimated bytes held by the entry: the JSON, its compressed copies and the
+        coordinate arrays of the decoded figure, which hold most of its memory.
+        """
+        return (
+            len(self.json)
+            + sum(len(body) for body in self.compressed.values())
+            + array_nbytes(self.figure)
+        )
+
+
+class FigureCache:
+    """
+    Byte-bounded LRU cache of figures that are built on first use.
+
+    Every entry holds the serialized figure JSON and the figure decoded from it. The
+    decoded dicts only contain JSON types and the read-only arrays of `pack_arrays`, so
+    returning them (or an overlay of them) from a callback costs a single encoder pass
+    without any plotly object traversal. They are shared by every request and must never
+    be mutated, per-session changes are applied with `apply_overlay`, which copies only
+    the parts of the figure it changes.
+
+    Concurrent requests for a figure that is not built yet are coalesced: the first one
+    builds it, the others wait for its result. Builds run outside of the cache lock, so
+    building one figure never blocks reads of another.
+
+    With `precompress`, the JSON is also compressed once when the figure is built, so it
+    can be served with a content coding without compressing it per request.
+
+    Args:
+        build (Callable[[Hashable], go.Figure]): Builds the figure for a key, e.g. a plot
+            title and a detail tier.
+        max_bytes (int): Upper bound for the summed size of the cached figure JSON, its
+            compressed copies and the coordinate arrays of the decoded figures, see
+            `FigureEntry.size`. The least recently used figures are evicted once it is
+            exceeded.
+        encoding (str, optional): Encoding of the trace coordinate arrays, see
+            `FIGURE_ENCODINGS`. Defaults to "json".
+        precompress (bool, optional): Whether to compress the JSON of every figure when it
+            is built, see `compress_figure`. Defaults to False.
+
+    Raises:
+        ValueError: `encoding` is unknown.
+    """
+
+    def __init__(
+            self,
+            build: Callable[[Hashable], go.Figure],
+            max_bytes: int,
+            encoding: str = "json",
+            precompress: bool = False
+    ) -> None:
+        self.build = build
+        self.max_bytes = max_bytes
+        if encoding not in FIGURE_ENCODINGS:
+            raise ValueError(f"Unknown figure encoding {encoding}, expected one of {FIGURE_ENCODINGS}")
+        self.encoding = encoding
+        self.precompress = precompress
+        self.size = 0
+        # Figures evicted or too large to be cached, i.e. the cache is full once non-zero
+        self.evictions = 0
+        self._entries: "OrderedDict[str, FigureEntry]" = OrderedDict()
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def __contains__(
+            self,
+            key: Hashable
+    ) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def discard(
+            self,
+            predicate: Callable[[Hashable], bool]
+    ) -> List[Hashable]:
+        """
+        Removes the cached figures whose key matches `predicate`, e.g. after the data of
+        some figures changed. Builds in progress are not affected.
+
+        Returns:
+            List[Hashable]: Keys of the removed figures, least recently used first.
+        """
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                self.size -= self._entries.pop(key).size
+
+        return keys
+
+    def get_entry(
+            self,
+            key: Hashable
+    ) -> FigureEntry:
+        """
+        Returns the cache entry of `key`, building the figure if needed.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+            future = self._in_flight.get(key)
+            is_builder = future is None
+            if is_builder:
+                future = Future()
+                self._in_flight[key] = future
+
+        if not is_builder:
+            return future.result()
+
+        try:
+            fig = self.build(key)
+            with STARTUP_REPORT.phase("serialization"):
+                figure_json = serialize_figure(fig, self.encoding)
+                figure = pack_arrays(load_json(figure_json))
+            with STARTUP_REPORT.phase("compression"):
+                compressed = compress_figure(figure_json) if self.precompress else {}
+            entry = FigureEntry(
+                json=figure_json,
+                figure=figure,
+                etag=hashlib.sha256(figure_json).hexdigest()[:32],
+                compressed=compressed,
+            )
+        except BaseException as exc:
+            with self._lock:
+                del self._in_flight[key]
+            future.set_exception(exc)
+            raise
+
+        with self._lock:
+            del self._in_flight[key]
+            self._store(key, entry)
+        future.set_result(entry)
+
+        return entry
+
+    def get(
+            self,
+            key: Hashable
+    ) -> dict:
+        """
+        Returns the decoded figure for `key`, building it if needed.
+        """
+        return self.get_entry(key).figure
+
+    def get_json(
+            self,
+            key: Hashable
+    ) -> bytes:
+        """
+        Returns the serialized figure for `key`, building it if needed.
+        """
+        return self.get_entry(key).json
+
+    def _store(
+            self,
+            key: Hashable,
+            entry: FigureEntry
+    ) -> None:
+        # Figures larger than the whole cache are handed out without being cached
+        if entry.size > self.max_bytes:
+            self.evictions += 1
+            return
+
+        self._entries[key] = entry
+        self.size += entry.size
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= evicted.size
+            self.evictions += 1
+
+
+def merge_dicts(
+        base: dict,
+        overlay: dict
+) -> dict:
+    """
+    Recursively merges `overlay` into a copy of `base`. Neither argument is modified.
+
+    Args:
+        base (dict): Dict to merge into.
+        overlay (dict): Values that take precedence over the ones in `base`.
+
+    Returns:
+        dict: New dict with the merged values.
+    """
+    merged = dict(base)
+    for key, value in overlay.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_dicts(merged[key], value)
+        else:
+            merged[key] = value
+
+    return merged
+
+
+def apply_overlay(
+        base_figure: dict,
+        annotations: List[dict],
+        uirevision: str
+) -> dict:
+    """
+    Merges a per-session overlay into a base figure at response time.
+
+    Only the layout, the scene and the annotations are copied, the traces (and with them
+    the z grids) are shared with the base figure.
+
+    Args:
+        base_figure (dict): Figure dict as returned by `FigureCache.get`.
+        annotations (List[dict]): Scene annotation properties, merged element-wise into the
+            annotations of the base figure.
+        uirevision (str): Value for `layout.uirevision`.
+
+    Returns:
+        dict: New figure dict that can be returned from a callback.
+    """
+    layout = dict(
+        base_figure["layout"],
+        uirevision=uirevision
+    )
+    scene = dict(layout.get("scene", {}))
+    base_annotations = list(scene.get("annotations", []))
+
+    for i, annotation in enumerate(annotations):
+        if i < len(base_annotations):
+            base_annotations[i] = merge_dicts(base_annotations[i], annotation)
+        else:
+            base_annotations.append(annotation)
+
+    scene["annotations"] = base_annotations
+    layout["scene"] = scene
+
+    return {
+        "data": base_figure["data"],
+        "layout": layout
+    }
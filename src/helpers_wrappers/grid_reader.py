@@ -0,0 +1,66 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Sequence
+import os
+import numpy as np
+
+
+def read_grid(
+        file_path: str
+) -> np.ndarray:
+    """
+    Reads a tab-delimited grid of numbers (one row per line, no header) straight into a
+    float64 array, without building a DataFrame.
+
+    Args:
+        file_path (str): Path of the grid file.
+
+    Raises:
+        ValueError: The rows of the grid don't all have the same number of values.
+
+    Returns:
+        np.ndarray: Array of shape (n_rows, n_cols).
+    """
+    with open(file_path, "rb") as file:
+        text = file.read().decode("ascii")
+
+    rows = text.split("\n")
+    while rows and not rows[-1].strip():
+        rows.pop()
+    if not rows:
+        return np.empty((0, 0))
+
+    # Whitespace of any kind separates values, so tabs and newlines are parsed in one pass
+    values = np.fromstring(text, dtype=np.float64, sep=" ")
+    n_cols = len(rows[0].split())
+    if values.size != len(rows) * n_cols:
+        raise ValueError(f"{file_path} is not a rectangular grid of {len(rows)} rows with {n_cols} values")
+
+    return values.reshape(len(rows), n_cols)
+
+
+def read_grids(
+        file_paths: Sequence[str],
+        max_workers: int = None,
+        use_processes: bool = False
+) -> List[np.ndarray]:
+    """
+    Reads many grid files in parallel with `read_grid`.
+
+    Args:
+        file_paths (Sequence[str]): Paths of the grid files.
+        max_workers (int, optional): Size of the pool. Defaults to the number of CPUs.
+        use_processes (bool, optional): Use a process pool instead of a thread pool. Worth it
+            for thousands of large grids, where parsing rather than I/O dominates.
+            Defaults to False.
+
+    Returns:
+        List[np.ndarray]: The grids, in the order of `file_paths`.
+    """
+    if len(file_paths) < 2:
+        return [read_grid(path) for path in file_paths]
+
+    max_workers = max_workers or os.cpu_count() or 1
+    executor = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    with executor(max_workers=max_workers) as pool:
+        chunksize = max(1, len(file_paths) // (max_workers * 4)) if use_processes else 1
+        return list(pool.map(read_grid, file_paths, chunksize=chunksize))
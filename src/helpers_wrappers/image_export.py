@@ -0,0 +1,374 @@
+"""
+Batch export of figures to static images, rendered in a pool of processes.
+
+Images are rendered with kaleido, plotly's local static image renderer. It is an optional
+dependency that isn't in requirements.txt and has to be installed on the hosts that export
+images (`pip install kaleido`), without it exports are refused. Every render process keeps its own
+renderer, so a batch uses one renderer per CPU instead of rendering one image at a time.
+
+Rendered images are cached on disk by the SHA-256 of the figure JSON and the render
+options, so exporting a figure again, e.g. for the next report, costs nothing until its
+data, annotations or options change.
+
+`register_export_routes` exposes jobs over HTTP:
+
+- `POST /exports` starts a job, with a JSON body of `titles` (default: every figure),
+  `format` (one of `EXPORT_FORMATS`), `width`, `height`, `scale` and `annotations`
+  (annotation input id to value, for the annotation overlay). Answers 202 with the job id
+  and its progress right away, the figures are built by the job.
+- `GET /exports/<job>` returns the progress of a job.
+- `GET /exports/<job>/images.zip` returns the images of a finished job.
+"""
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import threading
+import uuid
+import zipfile
+import flask
+import plotly.io as pio
+
+try:
+    import kaleido
+except ImportError:
+    kaleido = None
+
+EXPORT_FORMATS = ("png", "svg", "pdf")
+# Finished jobs that are kept for their progress and downloads
+MAX_JOBS = 32
+
+
+def export_key(
+        figure_json: bytes,
+        image_format: str,
+        width: Optional[int],
+        height: Optional[int],
+        scale: float
+) -> str:
+    """
+    Returns the cache key of an image: a hash of the figure and the render options.
+    """
+    digest = hashlib.sha256(figure_json)
+    digest.update(json.dumps([image_format, width, height, scale]).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def render_image(
+        figure_json: bytes,
+        path: str,
+        image_format: str,
+        width: Optional[int],
+        height: Optional[int],
+        scale: float
+) -> str:
+    """
+    Renders a serialized figure to an image file. Runs in the render processes.
+
+    Returns:
+        str: `path`.
+    """
+    image = pio.to_image(
+        json.loads(figure_json),
+        format=image_format,
+        width=width,
+        height=height,
+        scale=scale,
+        validate=False,
+        engine="kaleido"
+    )
+    # Written under a temporary name, so an interrupted render never leaves a cached file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(image)
+    os.replace(tmp_path, path)
+    return path
+
+
+class ExportJob:
+    """
+    Builds and renders a set of figures and tracks the progress, see `ImageExporter.export`.
+    """
+
+    def __init__(
+            self,
+            job_id: str,
+            image_format: str,
+            total: int
+    ) -> None:
+        self.id = job_id
+        self.format = image_format
+        self.total = total
+        # Figures built so far, rendering starts as soon as a figure is built
+        self.built = 0
+        # Plot title to image path, for rendered and cached images
+        self.paths: Dict[str, str] = {}
+        self.cached = 0
+        self.errors: Dict[str, str] = {}
+        self.done = threading.Event()
+        self._lock = threading.Lock()
+        if total == 0:
+            self.done.set()
+
+    def figure_built(
+            self
+    ) -> None:
+        with self._lock:
+            self.built += 1
+
+    def finish(
+            self,
+            title: str,
+            path: str = None,
+            error: str = None,
+            cached: bool = False
+    ) -> None:
+        with self._lock:
+            if error is None:
+                self.paths[title] = path
+                self.cached += cached
+            else:
+                self.errors[title] = error
+            if len(self.paths) + len(self.errors) == self.total:
+                self.done.set()
+
+    def progress(
+            self
+    ) -> dict:
+        with self._lock:
+            return {
+                "job": self.id,
+                "format": self.format,
+                "total": self.total,
+                "built": self.built,
+                "done": len(self.paths),
+                "cached": self.cached,
+                "failed": len(self.errors),
+                "errors": dict(self.errors),
+                "finished": self.done.is_set(),
+            }
+
+    def wait(
+            self,
+            timeout: float = None
+    ) -> bool:
+        return self.done.wait(timeout)
+
+    def archive(
+            self
+    ) -> bytes:
+        """
+        Returns a zip file with the images of the job, named by plot title.
+        """
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as archive:
+            with self._lock:
+                paths = dict(self.paths)
+            for title, path in sorted(paths.items()):
+                # Already compressed formats aren't compressed again
+                compression = zipfile.ZIP_DEFLATED if self.format == "svg" else zipfile.ZIP_STORED
+                archive.write(path, f"{title}.{self.format}", compress_type=compression)
+        return buffer.getvalue()
+
+
+class ImageExporter:
+    """
+    Renders figures to images in a process pool, caching the images by content hash.
+
+    Args:
+        cache_dir (str): Directory of the rendered images, created if it doesn't exist.
+        max_workers (int, optional): Number of render processes, started with the first
+            render. Defaults to the number of CPUs.
+    """
+
+    def __init__(
+            self,
+            cache_dir: str,
+            max_workers: int = None
+    ) -> None:
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers
+        self.jobs: "OrderedDict[str, ExportJob]" = OrderedDict()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def executor(
+            self
+    ) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # Render processes are spawned rather than forked from a process that runs
+                # threads (requests, reloads). A spawned process imports this module and
+                # re-imports the main module as `__mp_main__`: nothing more under gunicorn,
+                # but the whole of app.py (without running the server) in dev mode
+                self._executor = ProcessPoolExecutor(
+                    self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def export(
+            self,
+            titles: Iterable[str],
+            build_figure: Callable[[str], bytes],
+            image_format: str = "png",
+            width: int = None,
+            height: int = None,
+            scale: float = 1.0
+    ) -> ExportJob:
+        """
+        Starts building and rendering figures in a thread of the job, returning without
+        waiting for them.
+
+        Args:
+            titles (Iterable[str]): Plot titles to export.
+            build_figure (Callable[[str], bytes]): Returns the serialized figure of a plot
+                title. Called in the thread of the job, a failure only fails that title.
+            image_format (str, optional): One of `EXPORT_FORMATS`. Defaults to "png".
+            width (int, optional): Image width in pixels. Defaults to the figure's width.
+            height (int, optional): Image height in pixels. Defaults to the figure's height.
+            scale (float, optional): Factor applied to width and height, e.g. 2 for high
+                DPI images. Defaults to 1.
+
+        Raises:
+            ValueError: `image_format` is unknown.
+            RuntimeError: kaleido is not installed.
+
+        Returns:
+            ExportJob: The job, also kept in `jobs` by its id.
+        """
+        if image_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown image format {image_format}, expected one of {EXPORT_FORMATS}")
+        if kaleido is None:
+            raise RuntimeError("Exporting images requires the kaleido package")
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        titles = list(titles)
+        job = ExportJob(uuid.uuid4().hex[:12], image_format, len(titles))
+        with self._lock:
+            self.jobs[job.id] = job
+            while len(self.jobs) > MAX_JOBS and next(iter(self.jobs.values())).done.is_set():
+                self.jobs.popitem(last=False)
+
+        threading.Thread(
+            target=self._run,
+            args=(job, titles, build_figure, width, height, scale),
+            name=f"export-{job.id}",
+            daemon=True
+        ).start()
+        return job
+
+    def _run(
+            self,
+            job: ExportJob,
+            titles: List[str],
+            build_figure: Callable[[str], bytes],
+            width: Optional[int],
+            height: Optional[int],
+            scale: float
+    ) -> None:
+        for title in titles:
+            try:
+                figure_json = build_figure(title)
+                job.figure_built()
+                key = export_key(figure_json, job.format, width, height, scale)
+                path = os.path.join(self.cache_dir, f"{key}.{job.format}")
+                if os.path.exists(path):
+                    job.finish(title, path, cached=True)
+                    continue
+
+                future = self.executor().submit(render_image, figure_json, path, job.format, width, height, scale)
+            except Exception as error:
+                job.finish(title, error=f"{type(error).__name__}: {error}")
+                continue
+            future.add_done_callback(lambda done, title=title: self._collect(job, title, done))
+
+    @staticmethod
+    def _collect(
+            job: ExportJob,
+            title: str,
+            future: Future
+    ) -> None:
+        error = future.exception()
+        if error is None:
+            job.finish(title, future.result())
+        else:
+            job.finish(title, error=f"{type(error).__name__}: {error}")
+
+    def shutdown(
+            self
+    ) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+                self._executor = None
+
+
+def register_export_routes(
+        server: flask.Flask,
+        exporter: ImageExporter,
+        titles: Callable[[], Iterable[str]],
+        export_figure: Callable[[str, dict], bytes],
+        route: str = "/exports"
+) -> None:
+    """
+    Adds the export job endpoints to a Flask server, see the module docstring.
+
+    Args:
+        server (flask.Flask): Server to add the routes to, usually `app.server`.
+        exporter (ImageExporter): Exporter that runs the jobs.
+        titles (Callable[[], Iterable[str]]): Returns the plot titles that can be exported.
+        export_figure (Callable[[str, dict], bytes]): Returns the serialized figure of a
+            plot title, with the overlay of the given annotation input values.
+        route (str, optional): Path of the endpoints. Defaults to "/exports".
+    """
+
+    @server.route(route, methods=["POST"])
+    def start_export():
+        body = flask.request.get_json(silent=True) or {}
+        catalogue = list(titles())
+        requested = body.get("titles") or catalogue
+        known = set(catalogue)
+        unknown = [title for title in requested if title not in known]
+        if unknown:
+            return flask.jsonify(error=f"Unknown titles: {unknown}"), 404
+
+        annotations = body.get("annotations") or {}
+        try:
+            job = exporter.export(
+                requested,
+                lambda title: export_figure(title, annotations),
+                image_format=body.get("format", "png"),
+                width=body.get("width"),
+                height=body.get("height"),
+                scale=body.get("scale", 1.0),
+            )
+        except ValueError as error:
+            return flask.jsonify(error=str(error)), 400
+        except RuntimeError as error:
+            return flask.jsonify(error=str(error)), 501
+
+        return flask.jsonify(job.progress()), 202
+
+    def find_job(job_id: str) -> ExportJob:
+        job = exporter.jobs.get(job_id)
+        if job is None:
+            flask.abort(404)
+        return job
+
+    @server.route(f"{route}/<job_id>")
+    def export_progress(job_id):
+        return flask.jsonify(find_job(job_id).progress())
+
+    @server.route(f"{route}/<job_id>/images.zip")
+    def export_archive(job_id):
+        job = find_job(job_id)
+        if not job.done.is_set():
+            return flask.jsonify(job.progress()), 409
+        response = flask.Response(job.archive(), mimetype="application/zip")
+        response.headers["Content-Disposition"] = f"attachment; filename=images-{job.id}.zip"
+        return response
@@ -0,0 +1,331 @@
+"""
+Level-of-detail resampling of surfaces, so the browser renders a bounded number of vertices
+whatever the resolution of the source grid.
+
+Every surface has one tier per vertex budget in `LOD_BUDGETS`, computed when it is first
+drawn at that tier:
+
+- Grids that fit the budget are used as they are. Coarse grids are never upsampled, as
+  interpolating them adds vertices without changing the shape of the surface.
+- Grids with more vertices are decimated by keeping the rows and columns that matter most:
+  starting from the edges, the row or column that is worst approximated by interpolating
+  its kept neighbours is added until the budget is spent or every dropped row and column
+  is within `MAX_ERROR` of the kept ones.
+
+Tiers stay rectilinear (1D x and y), as `create_surface` expects. `SurfaceLODCache` keeps
+the tiers of the recently drawn surfaces within a byte budget.
+"""
+from bisect import bisect_right
+from collections import OrderedDict
+from math import isfinite
+from typing import Callable, Dict, Hashable, NamedTuple, Sequence, Tuple
+import threading
+import numpy as np
+
+from .surface_store import widen
+
+LOD_BUDGETS = (2500, 10000, 40000, 160000)
+# Tier used when the client sends no hint
+DEFAULT_TIER = 1
+# Values have two decimals, so decimation below half a unit in the last place is lossless
+MAX_ERROR = 0.005
+
+
+class Tier(NamedTuple):
+    """
+    A resampled surface and the largest deviation from the source grid.
+    """
+    x: np.ndarray
+    y: np.ndarray
+    z: np.ndarray
+    max_error: float
+
+    @property
+    def surface(
+            self
+    ) -> dict:
+        return {"x": self.x, "y": self.y, "z": self.z}
+
+
+def interpolate_axis(
+        values: np.ndarray,
+        positions: np.ndarray,
+        targets: np.ndarray,
+        axis: int
+) -> np.ndarray:
+    """
+    Linearly interpolates `values`, sampled at `positions` along `axis`, at `targets`.
+
+    Args:
+        values (np.ndarray): Values to interpolate.
+        positions (np.ndarray): Monotonic coordinates of `values` along `axis`.
+        targets (np.ndarray): Coordinates to interpolate at, within the range of `positions`.
+        axis (int): Axis of `values` to interpolate along.
+
+    Returns:
+        np.ndarray: Interpolated values, `len(targets)` long along `axis`.
+    """
+    if positions[0] > positions[-1]:
+        positions, targets = -positions, -targets
+
+    values = np.moveaxis(values, axis, 0)
+    right = np.clip(np.searchsorted(positions, targets, side="right"), 1, len(positions) - 1)
+    left = right - 1
+    weight = (targets - positions[left]) / (positions[right] - positions[left])
+    weight = weight.reshape((-1,) + (1,) * (values.ndim - 1))
+
+    return np.moveaxis(values[left] * (1 - weight) + values[right] * weight, 0, axis)
+
+
+def reconstruction_error(
+        x: np.ndarray,
+        y: np.ndarray,
+        z: np.ndarray,
+        rows: np.ndarray,
+        columns: np.ndarray
+) -> float:
+    """
+    Returns the largest difference between `z` and the surface interpolated from the kept
+    `rows` and `columns` of it.
+    """
+    kept = z[np.ix_(rows, columns)]
+    reconstructed = interpolate_axis(interpolate_axis(kept, y[rows], y, 0), x[columns], x, 1)
+    return float(np.abs(reconstructed - z).max())
+
+
+def segment_errors(
+        z: np.ndarray,
+        positions: np.ndarray,
+        start: int,
+        end: int,
+        axis: int
+) -> np.ndarray:
+    """
+    Returns, for every row (axis 0) or column (axis 1) strictly between `start` and `end`,
+    the largest difference to its interpolation from rows or columns `start` and `end`.
+    """
+    if end - start < 2:
+        return np.empty(0)
+
+    inner = np.take(z, np.arange(start + 1, end), axis=axis)
+    bounds = np.take(z, [start, end], axis=axis)
+    interpolated = interpolate_axis(bounds, positions[[start, end]], positions[start + 1:end], axis)
+    return np.abs(inner - interpolated).max(axis=1 - axis)
+
+
+class AxisSelection:
+    """
+    Kept rows or columns of a grid being decimated, with the error of every dropped one.
+    """
+
+    def __init__(
+            self,
+            z: np.ndarray,
+            positions: np.ndarray,
+            axis: int
+    ) -> None:
+        self.z = z
+        self.positions = positions
+        self.axis = axis
+        last = len(positions) - 1
+        self.kept = [0, last]
+        self.errors = np.zeros(len(positions))
+        self.errors[1:last] = segment_errors(z, positions, 0, last, axis)
+
+    def worst(
+            self
+    ) -> Tuple[int, float]:
+        index = int(self.errors.argmax())
+        return index, float(self.errors[index])
+
+    def keep(
+            self,
+            index: int
+    ) -> None:
+        # Only the errors of the segment that is split change
+        position = bisect_right(self.kept, index)
+        start, end = self.kept[position - 1], self.kept[position]
+        self.kept.insert(position, index)
+        self.errors[index] = 0
+        self.errors[start + 1:index] = segment_errors(self.z, self.positions, start, index, self.axis)
+        self.errors[index + 1:end] = segment_errors(self.z, self.positions, index, end, self.axis)
+
+
+def decimate(
+        x: np.ndarray,
+        y: np.ndarray,
+        z: np.ndarray,
+        budget: int,
+        max_error: float = MAX_ERROR
+) -> Tier:
+    """
+    Keeps at most `budget` vertices of a surface, choosing the rows and columns greedily by
+    how badly they are approximated by the kept ones, see the module docstring.
+    """
+    rows = AxisSelection(z, y, 0)
+    columns = AxisSelection(z, x, 1)
+
+    while True:
+        row, row_error = rows.worst()
+        column, column_error = columns.worst()
+        if max(row_error, column_error) <= max_error:
+            break
+
+        row_fits = (len(rows.kept) + 1) * len(columns.kept) <= budget
+        column_fits = len(rows.kept) * (len(columns.kept) + 1) <= budget
+        if row_fits and row_error > max_error and (row_error >= column_error or not column_fits):
+            rows.keep(row)
+        elif column_fits and column_error > max_error:
+            columns.keep(column)
+        else:
+            break
+
+    kept_rows = np.array(rows.kept)
+    kept_columns = np.array(columns.kept)
+    return Tier(
+        x=x[kept_columns],
+        y=y[kept_rows],
+        z=z[np.ix_(kept_rows, kept_columns)],
+        max_error=reconstruction_error(x, y, z, kept_rows, kept_columns)
+    )
+
+
+class SurfaceLOD:
+    """
+    Resolution tiers of a surface, one per budget in `budgets`, each computed on first use.
+
+    Args:
+        x (np.ndarray): X-axis values, one per column of `z`.
+        y (np.ndarray): Y-axis values, one per row of `z`.
+        z (np.ndarray): Stored surface values of shape (len(y), len(x)), e.g. a view into
+            the memory-mapped store. Only the computed tiers hold `widen`ed copies.
+        budgets (Sequence[int], optional): Vertex budgets. Defaults to `LOD_BUDGETS`.
+    """
+
+    def __init__(
+            self,
+            x: np.ndarray,
+            y: np.ndarray,
+            z: np.ndarray,
+            budgets: Sequence[int] = LOD_BUDGETS
+    ) -> None:
+        self.x = np.asarray(x, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64)
+        self.z = z
+        self.budgets = tuple(budgets)
+        self._tiers: Dict[int, Tier] = {}
+
+    def tier(
+            self,
+            index: int
+    ) -> Tier:
+        """
+        Returns the tier of `budgets[index]`, computing it if needed.
+        """
+        if index not in self._tiers:
+            z = widen(self.z)
+            if min(z.shape) < 2 or z.size <= self.budgets[index]:
+                tier = Tier(self.x, self.y, z, 0.0)
+            else:
+                tier = decimate(self.x, self.y, z, self.budgets[index])
+            self._tiers[index] = tier
+        return self._tiers[index]
+
+    @property
+    def nbytes(
+            self
+    ) -> int:
+        """
+        Bytes held by the computed tiers.
+        """
+        return sum(tier.x.nbytes + tier.y.nbytes + tier.z.nbytes for tier in self._tiers.values())
+
+
+class SurfaceLODCache:
+    """
+    Byte-bounded LRU cache of `SurfaceLOD`s, e.g. by surface name and revision.
+
+    Args:
+        max_bytes (int): Upper bound for the summed `SurfaceLOD.nbytes`. The least recently
+            used surfaces are dropped once it is exceeded.
+    """
+
+    def __init__(
+            self,
+            max_bytes: int
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "OrderedDict[Hashable, SurfaceLOD]" = OrderedDict()
+        self._sizes: Dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(
+            self
+    ) -> int:
+        return len(self._entries)
+
+    def tier(
+            self,
+            key: Hashable,
+            surface: Callable[[], dict],
+            index: int
+    ) -> Tier:
+        """
+        Returns tier `index` of the surface `key`.
+
+        Args:
+            key (Hashable): Cache key of the surface.
+            surface (Callable[[], dict]): Returns the surface as `{"x", "y", "z"}`, called
+                if `key` isn't cached.
+            index (int): Index of the tier, see `SurfaceLOD.tier`.
+        """
+        with self._lock:
+            lod = self._entries.get(key)
+        if lod is None:
+            lod = SurfaceLOD(**surface())
+        # Computed outside of the lock, concurrent requests for the same tier at worst
+        # compute it twice
+        tier = lod.tier(index)
+
+        with self._lock:
+            lod = self._entries.setdefault(key, lod)
+            self._entries.move_to_end(key)
+            self.size += lod.nbytes - self._sizes.get(key, 0)
+            self._sizes[key] = lod.nbytes
+            while self.size > self.max_bytes and len(self._entries) > 1:
+                evicted, _ = self._entries.popitem(last=False)
+                self.size -= self._sizes.pop(evicted)
+
+        return tier
+
+    def discard(
+            self,
+            predicate: Callable[[Hashable], bool]
+    ) -> None:
+        """
+        Drops the surfaces whose key matches `predicate`, e.g. older revisions on reload.
+        """
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
+                self.size -= self._sizes.pop(key)
+
+
+def choose_tier(
+        vertex_hint: object,
+        n_surfaces: int,
+        budgets: Sequence[int] = LOD_BUDGETS
+) -> int:
+    """
+    Returns the index of the largest tier whose vertices, summed over `n_surfaces`, fit the
+    client's `vertex_hint`. Falls back to the smallest tier, and to `DEFAULT_TIER` if there
+    is no hint or it isn't a positive number (it comes from the browser unchecked).
+    """
+    try:
+        vertex_hint = float(vertex_hint)
+    except (TypeError, ValueError):
+        return DEFAULT_TIER
+    if not isfinite(vertex_hint) or vertex_hint <= 0:
+        return DEFAULT_TIER
+    return max(0, bisect_right(budgets, vertex_hint / max(n_surfaces, 1)) - 1)
@@ -0,0 +1,171 @@
+"""
+Latency, payload size and call count metrics for Dash callbacks, exposed in the
+Prometheus text format on `/metrics`.
+
+Every request to Dash's callback route is measured in Flask `before_request` /
+`after_request` hooks, so the numbers include input validation and the serialization of
+the response, not just the callback function. Metrics are kept per process: with several
+gunicorn workers each worker reports its own counters.
+"""
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Tuple
+import threading
+import time
+import flask
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+class Histogram:
+    """
+    Cumulative histogram with fixed upper bounds, as used by Prometheus.
+    """
+
+    def __init__(
+            self,
+            buckets: Sequence[float]
+    ) -> None:
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(
+            self,
+            value: float
+    ) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(
+            self
+    ) -> List[Tuple[str, int]]:
+        """
+        Returns (upper bound, number of observations <= bound) pairs, ending with `+Inf`.
+        """
+        total = 0
+        result = []
+        for bound, count in zip(list(self.buckets) + ["+Inf"], self.counts):
+            total += count
+            result.append((bound if bound == "+Inf" else repr(bound), total))
+        return result
+
+
+def escape_label(
+        value: str
+) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+class CallbackMetrics:
+    """
+    Thread-safe store of per-callback duration and response size histograms and call counts.
+    """
+
+    def __init__(
+            self
+    ) -> None:
+        self.durations: Dict[str, Histogram] = {}
+        self.sizes: Dict[str, Histogram] = {}
+        self.calls: Dict[Tuple[str, int], int] = {}
+        self._lock = threading.Lock()
+
+    def observe(
+            self,
+            callback: str,
+            seconds: float,
+            size: int,
+            status: int
+    ) -> None:
+        with self._lock:
+            if callback not in self.durations:
+                self.durations[callback] = Histogram(DURATION_BUCKETS)
+                self.sizes[callback] = Histogram(SIZE_BUCKETS)
+            self.durations[callback].observe(seconds)
+            self.sizes[callback].observe(size)
+            self.calls[(callback, status)] = self.calls.get((callback, status), 0) + 1
+
+    def render(
+            self
+    ) -> str:
+        """
+        Returns all metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        with self._lock:
+            for name, description, histograms in [
+                ("dash_callback_duration_seconds", "Time to handle a callback request.", self.durations),
+                ("dash_callback_response_bytes", "Size of the callback response body.", self.sizes),
+            ]:
+                lines.append(f"# HELP {name} {description}")
+                lines.append(f"# TYPE {name} histogram")
+                for callback, histogram in sorted(histograms.items()):
+                    label = f"callback=\"{escape_label(callback)}\""
+                    for bound, count in histogram.cumulative():
+                        lines.append(f"{name}_bucket{{{label},le=\"{bound}\"}} {count}")
+                    lines.append(f"{name}_sum{{{label}}} {histogram.sum!r}")
+                    lines.append(f"{name}_count{{{label}}} {histogram.count}")
+
+            lines.append("# HELP dash_callback_calls_total Callback requests by response status.")
+            lines.append("# TYPE dash_callback_calls_total counter")
+            for (callback, status), count in sorted(self.calls.items()):
+                lines.append(
+                    f"dash_callback_calls_total{{callback=\"{escape_label(callback)}\",status=\"{status}\"}} {count}"
+                )
+
+        return "\n".join(lines) + "\n"
+
+
+def callback_name(
+        app,
+        output: str
+) -> str:
+    """
+    Returns the name of the function registered for `output`, or `output` itself.
+    """
+    callback = app.callback_map.get(output, {}).get("callback")
+    return getattr(callback, "__name__", output)
+
+
+def instrument_callbacks(
+        app,
+        route: str = "/metrics"
+) -> CallbackMetrics:
+    """
+    Measures every callback request of a Dash app and serves the metrics on `route`.
+
+    Args:
+        app (dash.Dash): App to instrument.
+        route (str, optional): Path of the metrics endpoint. Defaults to "/metrics".
+
+    Returns:
+        CallbackMetrics: The metrics store, for use in other routes or tests.
+    """
+    metrics = CallbackMetrics()
+    server = app.server
+
+    @server.before_request
+    def start_timer():
+        if flask.request.path.endswith("_dash-update-component"):
+            flask.g.callback_started = time.perf_counter()
+
+    @server.after_request
+    def record_callback(response):
+        started = flask.g.pop("callback_started", None)
+        if started is not None:
+            body = flask.request.get_json(silent=True) or {}
+            metrics.observe(
+                callback_name(app, body.get("output", "unknown")),
+                time.perf_counter() - started,
+                response.calculate_content_length() or 0,
+                response.status_code,
+            )
+        return response
+
+    @server.route(route)
+    def serve_metrics():
+        return flask.Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+    return metrics
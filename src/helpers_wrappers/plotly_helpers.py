@@ -1,163 +1,43 @@
-from typing import List, Tuple
+from typing import List
 import plotly.graph_objects as go
 import numpy as np
 
-COLOR_SCALES: dict[str, List[str]] = {
-    'Set3': [
-        "#8DD3C7",
-        "#FFFFB3",
-        "#BEBADA",
-        "#FB8072",
-        "#80B1D3",
-        "#FDB462",
-        "#B3DE69",
-        "#FCCDE5",
-        "#D9D9D9",
-        "#BC80BD",
-        "#CCEBC5",
-        "#FFED6F",
-    ],
-    'R_rainbow_10': [
-        "#FF0000",
-        "#FF9900",
-        "#CCFF00",
-        "#33FF00",
-        "#00FF66",
-        "#00FFFF",
-        "#0066FF",
-        "#3300FF",
-        "#CC00FF",
-        "#FF0099",
-    ],
-    'D3': [
-        "#1f77b4",
-        "#ff7f0e",
-        "#2ca02c",
-        "#d62728",
-        "#9467bd",
-        "#8c564b",
-        "#e377c2",
-        "#7f7f7f",
-        "#bcbd22",
-        "#17becf",
-    ],
-    'Plotly': [
-        "#636efa",
-        "#EF553B",
-        "#00cc96",
-        "#ab63fa",
-        "#FFA15A",
-        "#19d3f3",
-        "#FF6692",
-        "#B6E880",
-        "#FF97FF",
-        "#FECB52",
-    ],
-    'G10': [
-        "#3366CC",
-        "#DC3912",
-        "#FF9900",
-        "#109618",
-        "#990099",
-        "#3B3EAC",
-        "#0099C6",
-        "#DD4477",
-        "#66AA00",
-        "#B82E2E",
-    ],
-    'Set1': [
-        "#e41a1c",
-        "#377eb8",
-        "#4daf4a",
-        "#984ea3",
-        "#ff7f00",
-        "#ffff33",
-        "#a65628",
-        "#f781bf",
-        "#999999",
-    ],
-    'Light24': [
-        '#FD3216', '#00FE35', '#6A76FC', '#FED4C4', '#FE00CE', '#0DF9FF', '#F6F926',
-        '#FF9616', '#479B55', '#EEA6FB', '#DC587D', '#D626FF', '#6E899C', '#00B5F7',
-        '#B68E00', '#C9FBE5', '#FF0092', '#22FFA7', '#E3EE9E', '#86CE00', '#BC7196',
-        '#7E7DCD', '#FC6955', '#E48F72'
-    ],
-    'Vivid': [
-        'rgb(229, 134, 6)', 'rgb(93, 105, 177)', 'rgb(82, 188, 163)', 'rgb(153, 201, 69)',
-        'rgb(204, 97, 176)', 'rgb(36, 121, 108)', 'rgb(218, 165, 27)', 'rgb(47, 138, 196)',
-        'rgb(118, 78, 159)', 'rgb(237, 100, 90)', 'rgb(165, 170, 153)'
-    ],
-    'Pastel': [
-        'rgb(102, 197, 204)', 'rgb(246, 207, 113)', 'rgb(248, 156, 116)',
-        'rgb(220, 176, 242)', 'rgb(135, 197, 95)', 'rgb(158, 185, 243)',
-        'rgb(254, 136, 177)', 'rgb(201, 219, 116)', 'rgb(139, 224, 164)',
-        'rgb(180, 151, 231)', 'rgb(179, 179, 179)'
-    ]
-
-}
-
-
-def make_colorscale_cont(n_colors: int, pal: str = "Viridis") -> List[Tuple[float, str]]:
+from .colorscales import Colorscale, get_colorscale
+from .differences import difference_stack
+
+
+def make_colorscale_cont(n_colors: int, pal: str = "Viridis") -> Colorscale:
     """
     Generate a continuous colorscale for a given number of groups.
 
     Args:
         n_colors (int): Amount of groups to generate colors for.
-        pal (str, optional): Name of color palette to take colors from. Defaults to "RCB_Set3_12".
+        pal (str, optional): Name of color palette to take colors from. Defaults to "Viridis".
 
     Raises:
         ValueError: Specified palette `pal` not found in COLOR_SCALES.
 
     Returns:
-        List[Tuple[float, str]]: List of tuples of the form (scaled_value, color).
+        Colorscale: Shared tuple of (scaled_value, color) tuples, see `colorscales.get_colorscale`.
     """
-    scaled_values = np.linspace(0, 1, n_colors + 1)
-
-    if pal in COLOR_SCALES:
-        colors = COLOR_SCALES[pal]
-    else:
-        raise ValueError(f"Palette {pal} not found in COLOR_SCALES")
-
-    colors = colors[:n_colors]
-    colorscale = []
+    return get_colorscale(n_colors, pal, "continuous")
 
-    for i in range(n_colors):
-        entry1 = (scaled_values[i], colors[i])
-        colorscale.extend(entry1)
 
-    return colorscale
-
-
-def make_colorscale_distinct(n_colors: int, pal: str = "Set3") -> List[Tuple[float, str]]:
+def make_colorscale_distinct(n_colors: int, pal: str = "Set3") -> Colorscale:
     """
     Generate a distinct colorscale for a given number of groups.
 
     Args:
         n_colors (int): Amount of groups to generate colors for.
-        pal (str, optional): Name of color palette to take colors from. Defaults to "RCB_Set3_12".
+        pal (str, optional): Name of color palette to take colors from. Defaults to "Set3".
 
     Raises:
         ValueError: Specified palette `pal` not found in COLOR_SCALES.
 
     Returns:
-        List[Tuple[float, str]]: List of tuples of the form (scaled_value, color).
+        Colorscale: Shared tuple of (scaled_value, color) tuples, see `colorscales.get_colorscale`.
     """
-    scaled_values = np.linspace(0, 1, n_colors + 1)
-
-    if pal in COLOR_SCALES:
-        colors = COLOR_SCALES[pal]
-    else:
-        raise ValueError(f"Palette {pal} not found in COLOR_SCALES")
-
-    colors = colors[:n_colors]
-    colorscale = []
-
-    for i in range(n_colors):
-        entry1 = (scaled_values[i], colors[i])
-        entry2 = (scaled_values[i + 1], colors[i])
-        colorscale.extend((entry1, entry2))
-
-    return colorscale
+    return get_colorscale(n_colors, pal, "stepped")
 
 
 # def get_inputs(
@@ -254,7 +134,7 @@ def get_annotation_point(x, y, z):
 
     x_value = x[-1]
     y_value = y[-1]
-    z_value = z.iloc[-1, -1]
+    z_value = np.asarray(z)[-1, -1]
 
     return x_value, y_value, z_value
 
@@ -456,18 +336,8 @@ def create_layout(
 
 
 def percentage_difference(base_array: np.ndarray, compare_array: np.ndarray) -> np.ndarray:
-    # Calculate the absolute difference between the arrays
-    difference = np.abs(base_array - compare_array)
-
-    # Determine the maximum and minimum values in the base array
-    max_value = np.max(base_array)
-    min_value = np.min(base_array)
-
-    # Normalize the differences by the maximum possible difference in the base array
-    max_possible_difference = max_value - min_value
-    normalized_difference = difference / max_possible_difference
-
-    return normalized_difference * 100
+    # Absolute difference normalised by the range of the base array, in percent
+    return difference_stack(base_array, compare_array[np.newaxis], "percentage")[0]
 
 
 def create_diff_layout(
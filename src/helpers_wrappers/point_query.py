@@ -0,0 +1,295 @@
+"""
+Bulk lookup of surface values at arbitrary points, by bilinear interpolation.
+
+A query is split in two vectorised steps:
+
+1. `locate` finds the grid cell and the interpolation weights of every point, with one
+   `searchsorted` per axis.
+2. `interpolate` gathers the four corners of those cells from a whole stack of surfaces
+   at once and blends them.
+
+Surfaces of a group share their grid, and queries tend to repeat the same points (e.g.
+a route queried against every surface), so `PointQuery` locates a set of points once
+per grid and keeps the last located sets. Points outside a grid yield NaN, nothing is
+extrapolated.
+
+`register_query_route` exposes queries on `POST /query` with a JSON body of
+`{"surfaces": [...], "x": [...], "y": [...]}`, answered with
+`{"surfaces": {name: [value or null, ...]}}`. Values are rounded to the precision of the
+source data (`ARRAY_DECIMALS`).
+"""
+from collections import OrderedDict
+from typing import Callable, Dict, List, NamedTuple, Sequence, Tuple
+import hashlib
+import json
+import threading
+import flask
+import numpy as np
+
+from .figure_store import ARRAY_DECIMALS
+from .surface_store import SurfaceStore, widen
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Located point sets that are kept, each holds two int and three float arrays per point
+MAX_LOCATORS = 8
+
+
+class Locator(NamedTuple):
+    """
+    Cells and weights of a set of points on one grid, see `locate`.
+    """
+    # Flat index of the lower-left corner of the cell of every point, in a (ny, nx) grid
+    index: np.ndarray
+    nx: int
+    x_weight: np.ndarray
+    y_weight: np.ndarray
+    inside: np.ndarray
+
+
+def locate_axis(
+        axis: np.ndarray,
+        values: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Returns, for every value, the index of the grid interval it falls in, its relative
+    position within that interval and whether it's within the axis at all.
+    """
+    if axis[0] > axis[-1]:
+        axis, values = -axis, -values
+    index = np.clip(np.searchsorted(axis, values, side="right") - 1, 0, len(axis) - 2)
+    weight = (values - axis[index]) / (axis[index + 1] - axis[index])
+    inside = (values >= axis[0]) & (values <= axis[-1])
+    return index, weight, inside
+
+
+def locate(
+        x_axis: np.ndarray,
+        y_axis: np.ndarray,
+        x: np.ndarray,
+        y: np.ndarray
+) -> Locator:
+    """
+    Locates points on a rectilinear grid.
+
+    Args:
+        x_axis (np.ndarray): Monotonic x values of the grid columns, at least two.
+        y_axis (np.ndarray): Monotonic y values of the grid rows, at least two.
+        x (np.ndarray): X coordinate of every point.
+        y (np.ndarray): Y coordinate of every point.
+
+    Raises:
+        ValueError: `x` and `y` differ in length, or an axis has fewer than two values.
+
+    Returns:
+        Locator: Cells and weights for `interpolate`.
+    """
+    x = np.asarray(x, dtype=np.float64).ravel()
+    y = np.asarray(y, dtype=np.float64).ravel()
+    if x.shape != y.shape:
+        raise ValueError(f"Got {len(x)} x and {len(y)} y values")
+    if len(x_axis) < 2 or len(y_axis) < 2:
+        raise ValueError("Interpolation needs at least two values per axis")
+
+    column, x_weight, x_inside = locate_axis(np.asarray(x_axis, dtype=np.float64), x)
+    row, y_weight, y_inside = locate_axis(np.asarray(y_axis, dtype=np.float64), y)
+    return Locator(
+        index=row * len(x_axis) + column,
+        nx=len(x_axis),
+        x_weight=x_weight,
+        y_weight=y_weight,
+        inside=x_inside & y_inside
+    )
+
+
+def interpolate(
+        z: np.ndarray,
+        locator: Locator
+) -> np.ndarray:
+    """
+    Interpolates a stack of surfaces at located points.
+
+    Args:
+        z (np.ndarray): Surfaces of shape (n, ny, nx), on the grid of `locator`.
+        locator (Locator): Points, see `locate`.
+
+    Returns:
+        np.ndarray: Values of shape (n, n_points), NaN for points outside the grid.
+    """
+    flat = z.reshape(len(z), -1)
+    index, nx = locator.index, locator.nx
+    x_weight, y_weight = locator.x_weight, locator.y_weight
+
+    bottom = flat[:, index] * (1 - x_weight) + flat[:, index + 1] * x_weight
+    top = flat[:, index + nx] * (1 - x_weight) + flat[:, index + nx + 1] * x_weight
+    values = bottom * (1 - y_weight) + top * y_weight
+    values[:, ~locator.inside] = np.nan
+    return values
+
+
+class PointQuery:
+    """
+    Interpolates surfaces of a `SurfaceStore` at arbitrary points, see the module docstring.
+
+    Args:
+        store (SurfaceStore): Surfaces to query.
+        max_locators (int, optional): Number of located point sets that are kept.
+            Defaults to `MAX_LOCATORS`.
+    """
+
+    def __init__(
+            self,
+            store: SurfaceStore,
+            max_locators: int = MAX_LOCATORS
+    ) -> None:
+        self.store = store
+        self.max_locators = max_locators
+        self._locators: "OrderedDict[Tuple[str, str], Locator]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def locator(
+            self,
+            group: str,
+            x: np.ndarray,
+            y: np.ndarray
+    ) -> Locator:
+        """
+        Returns the located points on the grid of `group`, locating them if needed.
+        """
+        digest = hashlib.sha1(x.tobytes())
+        digest.update(y.tobytes())
+        key = (group, digest.hexdigest())
+        with self._lock:
+            if key in self._locators:
+                self._locators.move_to_end(key)
+                return self._locators[key]
+
+        surfaces = self.store.groups[group]
+        locator = locate(surfaces.x, surfaces.y, x, y)
+        with self._lock:
+            self._locators[key] = locator
+            if len(self._locators) > self.max_locators:
+                self._locators.popitem(last=False)
+        return locator
+
+    def query(
+            self,
+            names: Sequence[str],
+            x: Sequence[float],
+            y: Sequence[float]
+    ) -> Dict[str, np.ndarray]:
+        """
+        Interpolates surfaces at points, one gather per group of the requested surfaces.
+
+        Args:
+            names (Sequence[str]): Surface names.
+            x (Sequence[float]): Wave height of every point.
+            y (Sequence[float]): Current speed or wave period of every point, depending on
+                the surface.
+
+        Raises:
+            KeyError: A surface is unknown.
+            ValueError: `x` and `y` differ in length.
+
+        Returns:
+            Dict[str, np.ndarray]: Surface name to the values at the points, NaN outside
+                the grid of the surface.
+        """
+        x = np.ascontiguousarray(x, dtype=np.float64).ravel()
+        y = np.ascontiguousarray(y, dtype=np.float64).ravel()
+        if x.shape != y.shape:
+            raise ValueError(f"Got {len(x)} x and {len(y)} y values")
+
+        by_group: Dict[str, list] = {}
+        for name in names:
+            if name not in self.store:
+                raise KeyError(name)
+            by_group.setdefault(self.store.group_of[name], []).append(name)
+
+        result = {}
+        for group, group_names in by_group.items():
+            surfaces = self.store.groups[group]
+            z = widen(surfaces.z[[surfaces.index[name] for name in group_names]])
+            values = interpolate(z, self.locator(group, x, y))
+            result.update(zip(group_names, values))
+
+        return {name: result[name] for name in names}
+
+
+def dump_values(
+        values: Dict[str, np.ndarray]
+) -> bytes:
+    """
+    Serializes query results as `{"surfaces": {name: [...]}}`, with NaN as null.
+    """
+    if orjson is not None:
+        # orjson writes NaN as null
+        return orjson.dumps({"surfaces": values}, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(
+        {
+            "surfaces": {
+                name: [None if np.isnan(value) else value for value in array.tolist()]
+                for name, array in values.items()
+            }
+        }
+    ).encode("utf-8")
+
+
+def parse_query(
+        body: object
+) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """
+    Returns the surface names and the x and y values of a query body.
+
+    Raises:
+        ValueError: The body is not an object with a list of surface names and lists of
+            numbers as `x` and `y`.
+    """
+    if not isinstance(body, dict):
+        raise ValueError("Expected a JSON object")
+    surfaces = body.get("surfaces", [])
+    if not isinstance(surfaces, list) or not all(isinstance(name, str) for name in surfaces):
+        raise ValueError("'surfaces' must be a list of surface names")
+
+    axes = []
+    for axis in ("x", "y"):
+        values = body.get(axis, [])
+        array = np.asarray(values) if isinstance(values, list) else None
+        # Rejects strings, null, booleans and nested lists, which numpy would convert
+        if array is None or array.ndim != 1 or (array.size and array.dtype.kind not in "iuf"):
+            raise ValueError(f"'{axis}' must be a list of numbers")
+        axes.append(array.astype(np.float64))
+
+    return surfaces, axes[0], axes[1]
+
+
+def register_query_route(
+        server: flask.Flask,
+        point_query: Callable[[], PointQuery],
+        route: str = "/query"
+) -> None:
+    """
+    Adds the point query endpoint to a Flask server, see the module docstring.
+
+    Args:
+        server (flask.Flask): Server to add the route to, usually `app.server`.
+        point_query (Callable[[], PointQuery]): Returns the query of the current surfaces.
+        route (str, optional): Path of the endpoint. Defaults to "/query".
+    """
+
+    @server.route(route, methods=["POST"])
+    def query_points():
+        try:
+            surfaces, x, y = parse_query(flask.request.get_json(silent=True))
+            values = point_query().query(surfaces, x, y)
+        except KeyError as error:
+            return flask.jsonify(error=f"Unknown surface {error.args[0]}"), 404
+        except ValueError as error:
+            return flask.jsonify(error=str(error)), 400
+
+        # Interpolated values would otherwise carry more digits than the source data has
+        rounded = {name: np.round(array, ARRAY_DECIMALS) for name, array in values.items()}
+        return flask.Response(dump_values(rounded), mimetype="application/json")
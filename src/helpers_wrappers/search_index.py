@@ -0,0 +1,138 @@
+from bisect import bisect_left
+from typing import Dict, List, Tuple
+import re
+
+TOKEN_PATTERN = re.compile(r"[^0-9a-z]+")
+FACETS = ("group", "index", "y")
+
+
+def tokenize(
+        text: str
+) -> List[str]:
+    """
+    Splits `text` into lowercase alphanumeric tokens.
+    """
+    return [token for token in TOKEN_PATTERN.split(text.lower()) if token]
+
+
+def pairing_facets(
+        plot_title: str,
+        group: str
+) -> Dict[str, str]:
+    """
+    Returns the facets a pairing can be filtered by, derived the same way the figure labels
+    are derived in `app.build_figure`.
+    """
+    return {
+        "group": group.lower(),
+        "index": "see" if "SEE" in plot_title else "evrd",
+        "y": "period" if "WPI" in plot_title else "current",
+    }
+
+
+class PairingSearchIndex:
+    """
+    Server-side search over the plot titles of the surface pairings.
+
+    A query is split on whitespace. Terms of the form `facet:value` (e.g. `group:A02`,
+    `index:see`, `y:period`) must match a facet exactly; all other terms must match the
+    start of a token of the title or, failing that, appear anywhere in it. A term made of
+    several tokens (e.g. `a02_x`) must also appear as written in the title. Prefix matches
+    are looked up in a sorted token list, so a search doesn't scan the whole catalogue
+    unless it falls back to substring matching.
+
+    Args:
+        pairings (Dict[str, str]): Plot title to the group of its surfaces, in catalogue order.
+    """
+
+    def __init__(
+            self,
+            pairings: Dict[str, str]
+    ) -> None:
+        self.titles = list(pairings)
+        self.lower_titles = [title.lower() for title in self.titles]
+        self.facets = [pairing_facets(title, group) for title, group in pairings.items()]
+        self.tokens: List[Tuple[str, int]] = sorted(
+            (token, i)
+            for i, title in enumerate(self.titles)
+            for token in set(tokenize(title))
+        )
+
+    @classmethod
+    def from_artifact(
+            cls,
+            artifact: dict
+    ) -> "PairingSearchIndex":
+        """
+        Builds the index from a loaded artifact, see `artifact.load_artifact`.
+        """
+        group_of_name = {
+            name: group
+            for group, values in artifact["groups"].items()
+            for name in values["names"]
+        }
+        return cls(
+            {
+                plot_title: group_of_name[plot_title.split("+")[0]]
+                for plot_title in artifact["pairings"]
+            }
+        )
+
+    def prefix_matches(
+            self,
+            prefix: str
+    ) -> set:
+        """
+        Returns the positions of the titles that have a token starting with `prefix`.
+        """
+        matches = set()
+        position = bisect_left(self.tokens, (prefix, -1))
+        while position < len(self.tokens) and self.tokens[position][0].startswith(prefix):
+            matches.add(self.tokens[position][1])
+            position += 1
+        return matches
+
+    def search(
+            self,
+            query: str,
+            limit: int = 50
+    ) -> List[str]:
+        """
+        Returns at most `limit` plot titles matching `query`, in catalogue order. An empty
+        query matches everything.
+        """
+        facet_terms = []
+        text_terms = []
+        for term in (query or "").lower().split():
+            facet, _, value = term.partition(":")
+            if value and facet in FACETS:
+                facet_terms.append((facet, value))
+            else:
+                text_terms.append(term)
+
+        candidates = None
+        for term in text_terms:
+            matches = None
+            tokens = tokenize(term)
+            for token in tokens:
+                token_matches = self.prefix_matches(token)
+                matches = token_matches if matches is None else matches & token_matches
+            if matches and len(tokens) > 1:
+                # The tokens of a term must be adjacent, not just all in the title
+                matches = {i for i in matches if term in self.lower_titles[i]}
+            if not matches:
+                pool = candidates if candidates is not None else range(len(self.titles))
+                matches = {i for i in pool if term in self.lower_titles[i]}
+            candidates = matches if candidates is None else candidates & matches
+            if not candidates:
+                return []
+
+        positions = sorted(candidates) if candidates is not None else range(len(self.titles))
+        results = []
+        for i in positions:
+            if all(self.facets[i][facet] == value for facet, value in facet_terms):
+                results.append(self.titles[i])
+                if len(results) == limit:
+                    break
+
+        return results
@@ -0,0 +1,145 @@
+"""
+Opt-in report of where start-up time and memory go.
+
+Set the `STARTUP_REPORT` environment variable to enable it: `1` or `-` writes the report
+to stderr, any other value is used as the path of a JSON file. Phases are recorded with
+`STARTUP_REPORT.phase(name)`, nested phases are reported under their parent as
+`parent/child`. When disabled, `phase` does nothing and tracemalloc is never started.
+
+Only start-up is measured: phases are recorded on the thread that imported this module,
+as the peaks of concurrent phases on other threads (e.g. figures built by request or
+warm-up threads) would reset each other, and `emit` stops tracemalloc, which slows down
+every allocation, and ignores any phase after it.
+"""
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def max_rss_bytes() -> int:
+    """
+    Returns the peak resident set size of the process, or 0 where it isn't available.
+    """
+    if resource is None:
+        return 0
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and in kilobytes everywhere else
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+class StartupReport:
+    """
+    Collects wall time and traced memory per phase.
+
+    Args:
+        target (str, optional): Where `emit` writes the report, see the module docstring.
+            The report is disabled if None.
+    """
+
+    def __init__(
+            self,
+            target: str = None
+    ) -> None:
+        self.target = target
+        self.enabled = bool(target)
+        self.started = time.perf_counter()
+        self.phases: Dict[str, dict] = {}
+        self._thread = threading.get_ident()
+        self._stack: List[dict] = []
+        # Only stopped by `emit` if it was started here
+        self._tracing = self.enabled and not tracemalloc.is_tracing()
+        if self._tracing:
+            tracemalloc.start()
+
+    @contextmanager
+    def phase(
+            self,
+            name: str
+    ) -> Iterator[None]:
+        """
+        Records the wall time, the net allocated memory and the peak traced memory of the
+        code in the `with` block. The peak is counted from the traced memory at the start
+        of the phase, so memory held before it isn't included. Repeated phases are summed
+        and counted, keeping the largest peak. Does nothing on other threads than the one
+        that started the report and once it was emitted.
+        """
+        if not self.enabled or threading.get_ident() != self._thread:
+            yield
+            return
+
+        stack = self._stack
+        if stack:
+            parent = stack[-1]
+            parent["peak"] = max(parent["peak"], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+
+        path = "/".join([frame["path"] for frame in stack[-1:]] + [name])
+        allocated_before = tracemalloc.get_traced_memory()[0]
+        frame = {"path": path, "peak": allocated_before}
+        stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            allocated, peak = tracemalloc.get_traced_memory()
+            stack.pop()
+            frame["peak"] = max(frame["peak"], peak)
+            if stack:
+                stack[-1]["peak"] = max(stack[-1]["peak"], frame["peak"])
+
+            record = self.phases.setdefault(
+                path,
+                {"count": 0, "seconds": 0.0, "allocated_bytes": 0, "peak_bytes": 0}
+            )
+            record["count"] += 1
+            record["seconds"] += seconds
+            record["allocated_bytes"] += allocated - allocated_before
+            record["peak_bytes"] = max(record["peak_bytes"], frame["peak"] - allocated_before)
+
+    def as_dict(
+            self
+    ) -> dict:
+        current, peak = tracemalloc.get_traced_memory() if self.enabled else (0, 0)
+        return {
+            "pid": os.getpid(),
+            "total_seconds": time.perf_counter() - self.started,
+            "traced_bytes": current,
+            "peak_traced_bytes": peak,
+            "max_rss_bytes": max_rss_bytes(),
+            "phases": self.phases,
+        }
+
+    def emit(
+            self
+    ) -> None:
+        """
+        Writes the report to its target as JSON and ends it: tracemalloc is stopped and
+        later phases aren't recorded. Does nothing when disabled.
+        """
+        if not self.enabled:
+            return
+
+        report = json.dumps(self.as_dict(), indent=2)
+        self.enabled = False
+        if self._tracing:
+            tracemalloc.stop()
+            self._tracing = False
+        if self.target in ("1", "-"):
+            print(report, file=sys.stderr)
+        else:
+            with open(self.target, "w") as file:
+                file.write(report)
+
+
+STARTUP_REPORT = StartupReport(os.environ.get("STARTUP_REPORT"))
@@ -0,0 +1,167 @@
+"""
+Static, read-only copy of the app's figures that any file server or CDN can host.
+
+The site has this layout:
+
+    index.html              links to every page
+    plotly.min.js           the one copy of plotly.js, shared by every page (+ .gz/.br)
+    <slug>.html             one small page per figure
+    figures/<slug>.json     the figure, fetched by its page once the page has loaded
+    figures/<slug>.json.gz  the same, precompressed (and .br with the brotli package) for
+                            servers that serve precompressed files, e.g. nginx gzip_static
+
+Pages only contain the markup and a few lines of script, so the browser caches plotly.js
+once for the whole site and downloads one figure per page.
+"""
+from typing import Dict
+import html
+import os
+import re
+import plotly.offline
+
+from .figure_store import compress_figure
+
+PLOTLY_BUNDLE = "plotly.min.js"
+FIGURE_DIR = "figures"
+SLUG_PATTERN = re.compile(r"[^0-9A-Za-z_.@-]+")
+# File extension of the precompressed files per content coding of `compress_figure`
+CODING_EXTENSIONS = {"br": "br", "gzip": "gz"}
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ margin: 0; font-family: sans-serif; }}
+nav {{ padding: 0.5em 1em; }}
+#figure {{ width: 100vw; height: calc(100vh - 3em); }}
+</style>
+</head>
+<body>
+<nav><a href="index.html">All figures</a> / {title}</nav>
+<div id="figure">Loading...</div>
+<script src="{bundle}"></script>
+<script>
+fetch("{figure_url}")
+    .then((response) => response.json())
+    .then((figure) => {{
+        const element = document.getElementById("figure");
+        element.textContent = "";
+        Plotly.newPlot(element, figure.data, figure.layout, {{responsive: true}});
+    }});
+</script>
+</body>
+</html>
+"""
+
+INDEX_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+</head>
+<body>
+<h1>{title}</h1>
+<ul>
+{links}
+</ul>
+</body>
+</html>
+"""
+
+
+def slugify(
+        title: str
+) -> str:
+    """
+    Returns the file name stem of a figure, e.g. "SEE_A02_x+SEE_A02_y" -> "SEE_A02_x-SEE_A02_y".
+    """
+    return SLUG_PATTERN.sub("-", title).strip("-")
+
+
+def write_file(
+        path: str,
+        content: bytes
+) -> None:
+    # Replaced atomically, so a file server never serves a partly written file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(content)
+    os.replace(tmp_path, path)
+
+
+def write_bundle(
+        out_dir: str
+) -> str:
+    """
+    Writes the plotly.js bundled with the plotly package, which the figures were made
+    for, to the site, with the precompressed copies.
+
+    Returns:
+        str: Path of the written bundle.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, PLOTLY_BUNDLE)
+    bundle = plotly.offline.get_plotlyjs().encode("utf-8")
+    write_file(path, bundle)
+    for coding, body in compress_figure(bundle).items():
+        write_file(f"{path}.{CODING_EXTENSIONS[coding]}", body)
+    return path
+
+
+def write_page(
+        out_dir: str,
+        title: str,
+        figure_json: bytes
+) -> str:
+    """
+    Writes the page of a figure and its JSON, with the precompressed copies.
+
+    Args:
+        out_dir (str): Site directory.
+        title (str): Title of the figure, shown on the page and used for its file names.
+        figure_json (bytes): Serialized figure. It is loaded by the plotly.js of the
+            site, so the arrays must be plain number lists (not typed arrays).
+
+    Returns:
+        str: File name of the page, relative to `out_dir`.
+    """
+    slug = slugify(title)
+    os.makedirs(os.path.join(out_dir, FIGURE_DIR), exist_ok=True)
+
+    figure_path = os.path.join(out_dir, FIGURE_DIR, f"{slug}.json")
+    write_file(figure_path, figure_json)
+    for coding, body in compress_figure(figure_json).items():
+        write_file(f"{figure_path}.{CODING_EXTENSIONS[coding]}", body)
+
+    page = f"{slug}.html"
+    write_file(
+        os.path.join(out_dir, page),
+        PAGE_TEMPLATE.format(
+            title=html.escape(title),
+            bundle=PLOTLY_BUNDLE,
+            figure_url=f"{FIGURE_DIR}/{slug}.json",
+        ).encode("utf-8")
+    )
+    return page
+
+
+def write_index(
+        out_dir: str,
+        pages: Dict[str, str],
+        title: str = "Figures"
+) -> str:
+    """
+    Writes the index page, linking to `pages` (figure title to page file name) in order.
+
+    Returns:
+        str: Path of the index page.
+    """
+    links = "\n".join(
+        f'<li><a href="{html.escape(page)}">{html.escape(page_title)}</a></li>'
+        for page_title, page in pages.items()
+    )
+    path = os.path.join(out_dir, "index.html")
+    write_file(path, INDEX_TEMPLATE.format(title=html.escape(title), links=links).encode("utf-8"))
+    return path
@@ -10,6 +10,48 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
 
+CAM_DATA_HINT = "Interact with the graph to see camera properties"
+
+
+def create_cam_table(
+        input_graph: str,
+        data: list = None
+) -> dash_table.DataTable:
+    """
+    Creates the table showing the `eye` and `center` values of the scene camera.
+
+    Args:
+        input_graph (str): Name of input graph, just used for the id of the table
+        data (list, optional): Rows of the table, one dict per axis. Defaults to an empty table.
+
+    Returns:
+        A `dash_table.DataTable` with `Axis`, `Eye` and `Center` columns
+    """
+    return dash_table.DataTable(
+        id=f"{input_graph}-cam-properties",
+        columns=[
+            {
+                "name": "Axis",
+                "id": "Axis"},
+            {
+                "name": "Eye (Viewing Angle)",
+                "id": "Eye"},
+            {
+                "name": "Center",
+                "id": "Center"},
+        ],
+        data=data if data is not None else [],
+        style_cell={
+            "textAlign": "left"},
+        style_header={
+            "backgroundColor": "rgb(230, 230, 230)",
+            "fontWeight": "bold"
+        },
+        style_table={
+            "width": "25%"},
+    )
+
+
 def get_cam_data(
         cam_data: dict,
         input_graph: str
@@ -30,7 +72,7 @@ def get_cam_data(
         An `html.Div` containing a `dash_table.DataTable` with the `eye` and `center` values
     """
     if cam_data is None or "scene.camera" not in cam_data:
-        return "Interact with the graph to see camera properties"
+        return CAM_DATA_HINT
 
     camera_data = cam_data["scene.camera"]
     data = []
@@ -64,28 +106,9 @@ def get_cam_data(
 
     return html.Div(
         [
-            dash_table.DataTable(
-                id=f"{input_graph}-cam-properties",
-                columns=[
-                    {
-                        "name": "Axis",
-                        "id": "Axis"},
-                    {
-                        "name": "Eye (Viewing Angle)",
-                        "id": "Eye"},
-                    {
-                        "name": "Center",
-                        "id": "Center"},
-                ],
-                data=data,
-                style_cell={
-                    "textAlign": "left"},
-                style_header={
-                    "backgroundColor": "rgb(230, 230, 230)",
-                    "fontWeight": "bold"
-                },
-                style_table={
-                    "width": "25%"},
+            create_cam_table(
+                input_graph,
+                data
             )
         ]
     )
@@ -102,7 +125,6 @@ class Plot:
             plot_title: str
     ) -> None:
         self.layout = create_layout(
-            title=plot_title,
             x_label=AXIS_TITLES[0],
             y_label=AXIS_TITLES[1],
             z_label=AXIS_TITLES[2],
@@ -0,0 +1,169 @@
+"""
+Compact in-memory store of the surfaces, one contiguous array per group.
+
+Every group keeps the z values of all its surfaces in a single float32 array of shape
+(n_surfaces, ny, nx), with a name to index map and x and y axes shared by all surfaces.
+Per-group statistics are single vectorised reductions over the stack, and surfaces are
+handed out as views, so nothing is copied per surface.
+
+Float32 holds the two decimals of the source tables only approximately (13.84 is stored as
+13.84000015...). Arithmetic on the values therefore runs on `widen`ed copies, float64
+rounded back to `SOURCE_DECIMALS`, which are exactly the values of the tables.
+"""
+from typing import Dict, Iterator, Sequence
+import numpy as np
+
+from .differences import DifferenceEngine
+
+STORE_DTYPE = np.float32
+# Decimals of the source tables
+SOURCE_DECIMALS = 2
+
+
+def widen(
+        values: np.ndarray
+) -> np.ndarray:
+    """
+    Returns stored values as float64 rounded to `SOURCE_DECIMALS`, i.e. as the values of
+    the source tables.
+    """
+    return np.round(np.asarray(values, dtype=np.float64), SOURCE_DECIMALS)
+
+
+class SurfaceGroup:
+    """
+    The surfaces of one group, stacked.
+
+    Args:
+        names (Sequence[str]): Surface names, in the order of the first axis of `z`.
+        x (np.ndarray): nx values shared by all surfaces.
+        y (np.ndarray): ny values shared by all surfaces.
+        z (np.ndarray): Array of shape (n_surfaces, ny, nx). Used as is if it already is a
+            contiguous float32 array (e.g. memory-mapped from an artifact), copied otherwise.
+
+    Raises:
+        ValueError: The shape of `z` doesn't match the names and axes.
+    """
+
+    def __init__(
+            self,
+            names: Sequence[str],
+            x: np.ndarray,
+            y: np.ndarray,
+            z: np.ndarray
+    ) -> None:
+        self.names = list(names)
+        self.index: Dict[str, int] = {name: i for i, name in enumerate(self.names)}
+        self.x = np.asarray(x, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64)
+        if z.dtype != STORE_DTYPE or not z.flags.c_contiguous:
+            z = np.ascontiguousarray(z, dtype=STORE_DTYPE)
+        self.z = z
+
+        expected_shape = (len(self.names), len(self.y), len(self.x))
+        if self.z.shape != expected_shape:
+            raise ValueError(f"Got z shape {self.z.shape}, expected {expected_shape}")
+
+        self.max_values = widen(self.z.max(axis=(1, 2)))
+        self.differences = DifferenceEngine(self.names, self.z, decimals=SOURCE_DECIMALS)
+
+    def __len__(
+            self
+    ) -> int:
+        return len(self.names)
+
+    def __contains__(
+            self,
+            name: str
+    ) -> bool:
+        return name in self.index
+
+    def surface(
+            self,
+            name: str
+    ) -> dict:
+        """
+        Returns the surface `name` as `{"x", "y", "z"}`, z is a view into the stack.
+        """
+        return {"x": self.x, "y": self.y, "z": self.z[self.index[name]]}
+
+    def max_value(
+            self,
+            name: str
+    ) -> float:
+        return float(self.max_values[self.index[name]])
+
+
+class SurfaceStore:
+    """
+    All surface groups, with a lookup from surface name to group.
+
+    Args:
+        groups (Dict[str, SurfaceGroup]): Group name to group. Surface names must be unique
+            across groups.
+    """
+
+    def __init__(
+            self,
+            groups: Dict[str, SurfaceGroup]
+    ) -> None:
+        self.groups = groups
+        self.group_of: Dict[str, str] = {
+            name: group_name
+            for group_name, group in groups.items()
+            for name in group.names
+        }
+
+    @classmethod
+    def from_artifact(
+            cls,
+            artifact: dict
+    ) -> "SurfaceStore":
+        """
+        Creates the store from a loaded artifact, see `artifact.load_artifact`. Float32
+        artifacts are used without copying their memory-mapped arrays.
+        """
+        return cls(
+            {
+                group_name: SurfaceGroup(values["names"], values["x"], values["y"], values["z"])
+                for group_name, values in artifact["groups"].items()
+            }
+        )
+
+    def __iter__(
+            self
+    ) -> Iterator[str]:
+        return iter(self.group_of)
+
+    def __contains__(
+            self,
+            name: str
+    ) -> bool:
+        return name in self.group_of
+
+    def group(
+            self,
+            name: str
+    ) -> SurfaceGroup:
+        """
+        Returns the group of the surface `name`.
+        """
+        return self.groups[self.group_of[name]]
+
+    def surface(
+            self,
+            name: str
+    ) -> dict:
+        return self.group(name).surface(name)
+
+    def max_value(
+            self,
+            name: str
+    ) -> float:
+        return self.group(name).max_value(name)
+
+    @property
+    def nbytes(
+            self
+    ) -> int:
+        return sum(group.z.nbytes for group in self.groups.values())
@@ -0,0 +1,314 @@
+"""
+Background build of the figure catalogue, so the server answers requests while figures
+are still being built.
+
+`FigureWarmer` builds one figure after another in a daemon thread: every plot title at the
+default detail tier, plus the other tiers (see helpers_wrappers/lod.py) of the titles
+clients requested them at, the most requested first. Requests are counted per plot title
+and tier, in this process plus the counts of earlier runs, read from and merged back into
+a JSON file of `{plot title: {tier: count}}`. It stops early once the figure cache is full,
+as building more would only evict more popular figures. A request for a figure that isn't
+built yet builds it itself, so the warmer only decides what is ready before anyone asks.
+
+`register_health_routes` adds two endpoints for the platform's health checks:
+
+- `/healthz` answers 200 as soon as the server is up, with the build progress.
+- `/readyz` answers 200 once the figures the first page needs are built, 503 before.
+"""
+from collections import Counter
+from typing import Callable, Collection, Dict, Iterable, List, Optional, Tuple
+import heapq
+import json
+import logging
+import os
+import threading
+import time
+import flask
+
+from .lod import DEFAULT_TIER
+
+logger = logging.getLogger(__name__)
+
+
+def load_popularity(
+        path: Optional[str]
+) -> Counter:
+    """
+    Reads request counts per plot title and tier, empty if `path` is None or doesn't
+    exist. Counts of a title without tiers, as written by earlier versions, are taken as
+    requests at `DEFAULT_TIER`.
+    """
+    if path is None:
+        return Counter()
+    try:
+        with open(path) as file:
+            stored = json.load(file)
+    except FileNotFoundError:
+        return Counter()
+
+    counts = Counter()
+    for title, tiers in stored.items():
+        if not isinstance(tiers, dict):
+            tiers = {DEFAULT_TIER: tiers}
+        for tier, count in tiers.items():
+            counts[title, int(tier)] += int(count)
+    return counts
+
+
+def save_popularity(
+        path: str,
+        counts: Counter
+) -> None:
+    """
+    Adds `counts` to the request counts stored in `path`. Workers that save at the same
+    time may lose each other's counts, which only affects the build order.
+    """
+    stored: Dict[str, Dict[str, int]] = {}
+    for (title, tier), count in (load_popularity(path) + counts).most_common():
+        stored.setdefault(title, {})[str(tier)] = count
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as file:
+        json.dump(stored, file, indent=2)
+    os.replace(tmp_path, path)
+
+
+class FigureWarmer:
+    """
+    Builds the figures of a catalogue of plot titles in a background thread.
+
+    The figures still to build are kept in a heap, ordered by whether they are required
+    and by their number of requests. A request pushes its figure again with the new
+    count, and outdated heap entries are skipped when they come up, so neither picking
+    the next figure nor counting a request scans the catalogue.
+
+    Args:
+        build (Callable[[str, int], object]): Builds and caches the figure of a plot title
+            at a detail tier.
+        titles (Callable[[], Collection[str]]): Returns the current catalogue, in the
+            order used between figures with the same number of requests. The pending
+            figures are collected again whenever it returns another object, e.g. after a
+            reload.
+        popularity (Counter, optional): Request counts per plot title and tier of earlier
+            runs. Defaults to none.
+        required (Iterable[str], optional): Titles that must be built before the server
+            is ready, e.g. the one shown on the first page: at `default_tier` and at every
+            tier they were requested at in `popularity`. Defaults to none.
+        is_full (Callable[[], bool], optional): Returns whether the figure cache is full,
+            the warmer stops building once it does. Defaults to never.
+        default_tier (int, optional): Tier every title is built at. Defaults to
+            `DEFAULT_TIER`.
+    """
+
+    def __init__(
+            self,
+            build: Callable[[str, int], object],
+            titles: Callable[[], Collection[str]],
+            popularity: Counter = None,
+            required: Iterable[str] = (),
+            is_full: Callable[[], bool] = lambda: False,
+            default_tier: int = DEFAULT_TIER
+    ) -> None:
+        self.build = build
+        self.titles = titles
+        self.popularity = Counter(popularity or {})
+        self.requests: Counter = Counter()
+        self.default_tier = default_tier
+        required = set(required)
+        self.required = {(title, default_tier) for title in required} | {
+            (title, tier) for title, tier in self.popularity if title in required
+        }
+        self.is_full = is_full
+        self.built = set()
+        self.failed = set()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._catalogue: Optional[Collection[str]] = None
+        self._order: Dict[str, int] = {}
+        # Every figure the warmer would build, the pending ones are in the heap
+        self._figures = set()
+        self._heap: List[Tuple[bool, int, bool, int, str, int]] = []
+
+    def _push(
+            self,
+            item: Tuple[str, int]
+    ) -> None:
+        # Called with the lock held; skips titles that aren't in the catalogue
+        title, tier = item
+        if title in self._order and item not in self.built and item not in self.failed:
+            count = self.popularity[item] + self.requests[item]
+            heapq.heappush(
+                self._heap,
+                (item not in self.required, -count, tier != self.default_tier, self._order[title], title, tier)
+            )
+
+    def _collect(
+            self,
+            catalogue: Collection[str]
+    ) -> None:
+        # Called with the lock held
+        self._catalogue = catalogue
+        self._order = {title: index for index, title in enumerate(catalogue)}
+        self._figures = {
+            (title, tier)
+            for title, tier in set(self.popularity) | set(self.requests) | self.required
+            if title in self._order
+        }
+        self._figures.update((title, self.default_tier) for title in catalogue)
+        self._heap = []
+        for item in self._figures:
+            self._push(item)
+
+    def request(
+            self,
+            title: str,
+            tier: int
+    ) -> None:
+        """
+        Counts a request for the figure of `title` at `tier`.
+        """
+        with self._lock:
+            self.requests[title, tier] += 1
+            if self._catalogue is not None and title in self._order:
+                self._figures.add((title, tier))
+                self._push((title, tier))
+
+    def next_figure(
+            self
+    ) -> Optional[Tuple[str, int]]:
+        """
+        Returns the plot title and tier to build next: required figures first, then by
+        number of requests, or None once every figure is built.
+        """
+        with self._lock:
+            catalogue = self.titles()
+            if catalogue is not self._catalogue:
+                self._collect(catalogue)
+            while self._heap:
+                _, count, _, _, title, tier = self._heap[0]
+                item = (title, tier)
+                if (
+                        item in self.built
+                        or item in self.failed
+                        or title not in self._order
+                        # A request pushed the figure again with a higher count
+                        or -count != self.popularity[item] + self.requests[item]
+                ):
+                    heapq.heappop(self._heap)
+                    continue
+                return item
+            return None
+
+    def warm(
+            self,
+            title: str,
+            tier: int = None
+    ) -> None:
+        """
+        Builds the figure of `title` at `tier` (defaults to `default_tier`) and records it
+        as built, or as failed.
+        """
+        item = (title, self.default_tier if tier is None else tier)
+        try:
+            self.build(*item)
+            with self._lock:
+                self.built.add(item)
+        except Exception:
+            # Requests for the figure will build it themselves and report the error
+            logger.exception("Building the figure of %s at tier %d failed", *item)
+            with self._lock:
+                self.failed.add(item)
+
+    def run(
+            self,
+            popular_only: bool = False
+    ) -> None:
+        """
+        Builds the figures of the catalogue until all are built, the cache is full or
+        `stop` is called, blocking until then. Required figures are always built.
+
+        Args:
+            popular_only (bool, optional): Stop once only figures that were never
+                requested are left, which bounds the time spent by the number of popular
+                figures instead of the size of the catalogue. Defaults to False.
+        """
+        if self.started is None:
+            self.started = time.perf_counter()
+        while not self._stop.is_set():
+            item = self.next_figure()
+            if item is None or (item not in self.required and (
+                    self.is_full() or (popular_only and not self.popularity[item] + self.requests[item])
+            )):
+                self.finished = time.perf_counter()
+                return
+            self.warm(*item)
+
+    def start(
+            self
+    ) -> None:
+        """
+        Runs `run` in a daemon thread. Like `DatasetRegistry`, the warmer must be stopped
+        before a fork and started again in the child, see gunicorn.conf.py.
+        """
+        if self._thread is None:
+            self._stop = threading.Event()
+            self._thread = threading.Thread(target=self.run, name="figure-warmer", daemon=True)
+            self._thread.start()
+
+    def stop(
+            self
+    ) -> None:
+        """
+        Stops building after the figure in progress, waiting for it.
+        """
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    @property
+    def ready(
+            self
+    ) -> bool:
+        with self._lock:
+            return self.required <= self.built
+
+    def progress(
+            self
+    ) -> Dict[str, object]:
+        """
+        Returns the number of figures built, failed and to build (every title at the
+        default tier and the requested tiers), and the seconds spent building them.
+        """
+        with self._lock:
+            built, failed = len(self.built), len(self.failed)
+            total = len(self._figures) if self._catalogue is not None else len(self.titles())
+        end = self.finished or time.perf_counter()
+        return {
+            "ready": self.ready,
+            "built": built,
+            "failed": failed,
+            "total": total,
+            "seconds": round(end - self.started, 3) if self.started is not None else 0.0,
+        }
+
+
+def register_health_routes(
+        server: flask.Flask,
+        warmer: FigureWarmer
+) -> None:
+    """
+    Adds `/healthz` and `/readyz` to a Flask server, see the module docstring.
+    """
+
+    @server.route("/healthz")
+    def healthz():
+        return flask.jsonify(status="ok", **warmer.progress())
+
+    @server.route("/readyz")
+    def readyz():
+        progress = warmer.progress()
+        status = 200 if progress["ready"] else 503
+        return flask.jsonify(status="ready" if progress["ready"] else "building", **progress), status